@@ -20,3 +20,6 @@ class EdxExtendedApiConfig(AppConfig):
             }
         }
     }
+
+    def ready(self):
+        from . import signals  # pylint: disable=unused-import
@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks of the list endpoints on synthetic organizations.
+
+They are skipped unless `EDX_EXTENDED_API_BENCHMARK` environment variable is set, e.g. inside lms shell:
+
+    EDX_EXTENDED_API_BENCHMARK=1 EDX_EXTENDED_API_BENCHMARK_SIZES=100,1000 \\
+        pytest /edx/src/edx-extended-api/edx_extended_api/benchmarks.py
+
+Every endpoint is measured at every organization size: latency over the repeats, number of queries
+and peak memory. Results are written as JSON to `EDX_EXTENDED_API_BENCHMARK_REPORT`, and compared
+with the report given in `EDX_EXTENDED_API_BENCHMARK_BASELINE` when there is one.
+"""
+from __future__ import print_function, unicode_literals
+
+import gc
+import json
+import os
+import resource
+import threading
+import time
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from student import triboo_groups
+from student.models import UserProfile
+from triboo_analytics.models import ANALYTICS_ACCESS_GROUP, LearnerBadgeJsonReport, LearnerCourseJsonReport
+from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
+from xmodule.modulestore.tests.factories import CourseFactory, XMODULE_FACTORY_LOCK
+
+from .tests import create_mock_site_config
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2 has no tracemalloc, the resident memory of the process is sampled instead.
+    tracemalloc = None
+
+
+User = get_user_model()
+
+BENCHMARK_ENABLED = bool(os.environ.get('EDX_EXTENDED_API_BENCHMARK'))
+BENCHMARK_SIZES = sorted(
+    int(size) for size in os.environ.get('EDX_EXTENDED_API_BENCHMARK_SIZES', '10,100,1000').split(',')
+    if size.strip().isdigit()
+)
+BENCHMARK_COURSES = int(os.environ.get('EDX_EXTENDED_API_BENCHMARK_COURSES', 5))
+BENCHMARK_BADGES = int(os.environ.get('EDX_EXTENDED_API_BENCHMARK_BADGES', 2))
+BENCHMARK_REPEAT = int(os.environ.get('EDX_EXTENDED_API_BENCHMARK_REPEAT', 5))
+BENCHMARK_REPORT = os.environ.get('EDX_EXTENDED_API_BENCHMARK_REPORT', 'edx_extended_api_benchmark.json')
+BENCHMARK_BASELINE = os.environ.get('EDX_EXTENDED_API_BENCHMARK_BASELINE')
+BENCHMARK_ORG = 'FooOrg'
+
+# (name, url name, query parameters)
+BENCHMARK_ENDPOINTS = (
+    ('users', 'edx_extended_api:users-list', {}),
+    ('users_cursor', 'edx_extended_api:users-list', {'pagination': 'cursor', 'page_size': 1000}),
+    ('users_export', 'edx_extended_api:users-export', {}),
+    ('courses', 'edx_extended_api:courses-list', {}),
+    ('user_progress_report', 'edx_extended_api:user_progress_report-list', {}),
+    ('user_progress_report_cursor', 'edx_extended_api:user_progress_report-list', {
+        'pagination': 'cursor', 'page_size': 1000
+    }),
+)
+
+# Every n-th synthetic user is member of the group.
+SYNTHETIC_GROUPS = (
+    (ANALYTICS_ACCESS_GROUP, 3),
+    (triboo_groups.CATALOG_DENIED_GROUP, 5),
+    (triboo_groups.EDFLEX_DENIED_GROUP, 7),
+)
+
+
+def _model_kwargs(model, **values):
+    """
+    Keeps the values of the fields the model has, analytics models differ between platform releases.
+    """
+    field_names = set(field.name for field in model._meta.get_fields())
+    field_names.update(field.attname for field in model._meta.concrete_fields)
+    return {name: value for name, value in values.items() if name in field_names}
+
+
+def create_synthetic_courses(org, count):
+    """
+    Creates published courses and their overviews, returns the course overviews.
+    """
+    overviews = []
+    for index in range(count):
+        course = CourseFactory.create(
+            org=org, number='bench{}'.format(index), run='run', display_name='Benchmark course {}'.format(index)
+        )
+        overviews.append(CourseOverview.get_from_id(course.id))
+    return overviews
+
+
+def create_synthetic_badges(course_overviews, count):
+    """
+    Creates `count` badges per course, returns them.
+    """
+    badge_model = LearnerBadgeJsonReport._meta.get_field('badge').related_model
+    badges = []
+    for course_overview in course_overviews:
+        for index in range(count):
+            badges.append(badge_model.objects.create(**_model_kwargs(
+                badge_model,
+                course_id=course_overview.id,
+                badge_hash='{}-{}'.format(course_overview.id, index),
+                grading_rule='Homework',
+                section_name='Section {}'.format(index),
+                threshold=0.5
+            )))
+    return badges
+
+
+def create_synthetic_users(org, start, stop, course_overviews, badges):
+    """
+    Bulk creates users number `start` to `stop` of the organization with their profiles, groups,
+    course reports and badge reports.
+    """
+    prefix = 'bench_{}_'.format(org.lower())
+    User.objects.bulk_create([
+        User(
+            username='{}{}'.format(prefix, index),
+            email='{}{}@example.com'.format(prefix, index),
+            first_name='First{}'.format(index),
+            last_name='Last{}'.format(index),
+        )
+        for index in range(start, stop)
+    ], batch_size=1000)
+    users_ids = list(User.objects.filter(
+        username__in=['{}{}'.format(prefix, index) for index in range(start, stop)]
+    ).order_by('id').values_list('id', flat=True))
+
+    UserProfile.objects.bulk_create([
+        UserProfile(
+            user_id=user_id,
+            org=org,
+            name='User {}'.format(user_id),
+            city='Paris',
+            lt_company='Company',
+            lt_department='Department {}'.format(user_id % 10),
+            lt_supervisor='{}{}'.format(prefix, start),
+            lt_gdpr=True,
+        )
+        for user_id in users_ids
+    ], batch_size=1000)
+
+    memberships = []
+    for group_name, every in SYNTHETIC_GROUPS:
+        group_id = Group.objects.get_or_create(name=group_name)[0].id
+        memberships.extend(
+            User.groups.through(user_id=user_id, group_id=group_id)
+            for index, user_id in enumerate(users_ids, start) if index % every == 0
+        )
+    User.groups.through.objects.bulk_create(memberships, batch_size=1000)
+
+    LearnerCourseJsonReport.objects.bulk_create([
+        LearnerCourseJsonReport(user_id=user_id, course_id=course_overview.id, org=org)
+        for user_id in users_ids for course_overview in course_overviews
+    ], batch_size=1000)
+    now = timezone.now()
+    LearnerBadgeJsonReport.objects.bulk_create([
+        LearnerBadgeJsonReport(**_model_kwargs(
+            LearnerBadgeJsonReport, user_id=user_id, badge=badge, score=0.8, success=True, success_date=now
+        ))
+        for user_id in users_ids for badge in badges
+    ], batch_size=1000)
+
+
+def _rss_kb():
+    """
+    Returns the current resident memory of the process in KB, read from `/proc` (Linux).
+    """
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * resource.getpagesize() // 1024
+
+
+class RssSampler(threading.Thread):
+    """
+    Samples the resident memory of the process until stopped, to get its peak over the starting one.
+    """
+
+    def __init__(self, interval=0.005):
+        super(RssSampler, self).__init__()
+        self.daemon = True
+        self.interval = interval
+        self.start_rss = self.peak_rss = _rss_kb()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.peak_rss = max(self.peak_rss, _rss_kb())
+
+    def stop(self):
+        """
+        Stops sampling, returns the peak growth of the resident memory in KB.
+        """
+        self.stopped.set()
+        self.join()
+        self.peak_rss = max(self.peak_rss, _rss_kb())
+        return self.peak_rss - self.start_rss
+
+
+def measure(client, url, repeat):
+    """
+    Requests the url `repeat` times, returns status, latencies in ms, number of queries and peak memory in KB.
+
+    Memory is measured on a separate request, tracing allocations slows the measured ones down.
+    Without tracemalloc, it is the peak of the resident memory sampled during the request minus the one
+    at its start, which misses the memory freed by previous requests and reused by this one.
+    """
+    gc.collect()
+    if tracemalloc:
+        tracemalloc.start()
+    else:
+        sampler = RssSampler()
+        sampler.start()
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+        # Streaming responses run their queries while being consumed.
+        if response.streaming:
+            b''.join(response.streaming_content)
+    if tracemalloc:
+        peak_memory = tracemalloc.get_traced_memory()[1] // 1024
+        tracemalloc.stop()
+    else:
+        peak_memory = sampler.stop()
+
+    latencies = []
+    for __ in range(repeat):
+        start = time.time()
+        response = client.get(url)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        latencies.append((time.time() - start) * 1000)
+    latencies.sort()
+    return {
+        'status': response.status_code,
+        'latency_min_ms': round(latencies[0], 2),
+        'latency_median_ms': round(latencies[len(latencies) // 2], 2),
+        'queries': len(queries),
+        'peak_memory_kb': peak_memory,
+        'memory_source': 'tracemalloc' if tracemalloc else 'rss_sampling',
+    }
+
+
+def compare_with_baseline(results, baseline_path):
+    """
+    Adds to each result the ratio of its median latency, queries and memory to the same measure of the baseline.
+    """
+    with open(baseline_path) as baseline_file:
+        baseline = {(result['endpoint'], result['users']): result for result in json.load(baseline_file)['results']}
+    for result in results:
+        previous = baseline.get((result['endpoint'], result['users']))
+        if previous is None:
+            continue
+        result['baseline'] = {
+            key: previous[key] and round(float(result[key]) / previous[key], 2)
+            for key in ('latency_median_ms', 'queries', 'peak_memory_kb')
+        }
+
+
+@skipUnless(BENCHMARK_ENABLED, 'Set EDX_EXTENDED_API_BENCHMARK to run the benchmarks.')
+class EndpointsBenchmark(APITestCase):
+
+    def setUp(self):
+        create_mock_site_config()
+        XMODULE_FACTORY_LOCK.enable()
+
+        self.user = User.objects.create(
+            username='edx',
+            is_staff=True,
+            is_superuser=True,
+            email='edx@example.com'
+        )
+        UserProfile.objects.create(
+            user=self.user,
+            org=BENCHMARK_ORG
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_endpoints(self):
+        course_overviews = create_synthetic_courses(BENCHMARK_ORG, BENCHMARK_COURSES)
+        badges = create_synthetic_badges(course_overviews, BENCHMARK_BADGES)
+
+        results = []
+        created = 0
+        for size in BENCHMARK_SIZES:
+            create_synthetic_users(BENCHMARK_ORG, created, size, course_overviews, badges)
+            created = max(created, size)
+            for name, url_name, params in BENCHMARK_ENDPOINTS:
+                url = reverse(url_name)
+                if params:
+                    url = '{}?{}'.format(url, '&'.join('{}={}'.format(key, value) for key, value in params.items()))
+                result = measure(self.client, url, BENCHMARK_REPEAT)
+                self.assertEqual(result['status'], 200, url)
+                result.update({'endpoint': name, 'users': size, 'courses': BENCHMARK_COURSES})
+                results.append(result)
+                print('{endpoint:<30} {users:>7} users {latency_median_ms:>10} ms {queries:>5} queries '
+                      '{peak_memory_kb:>8} KB'.format(**result))
+
+        if BENCHMARK_BASELINE:
+            compare_with_baseline(results, BENCHMARK_BASELINE)
+        with open(BENCHMARK_REPORT, 'w') as report_file:
+            json.dump({
+                'sizes': BENCHMARK_SIZES,
+                'courses': BENCHMARK_COURSES,
+                'badges_per_course': BENCHMARK_BADGES,
+                'repeat': BENCHMARK_REPEAT,
+                'results': results,
+            }, report_file, indent=2, sort_keys=True)
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Copy of the `CourseDetails` attributes of the courses, refreshed on publish, so the API neither reads
+the modulestore nor filters the catalog in memory.
+"""
+from __future__ import unicode_literals
+
+import json
+
+from django.db import transaction
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import CourseMetadata, CourseMetadataValue
+from .utils import COURSE_DETAILS_ATTRIBUTES, fetch_course_details
+
+
+# (filter and `CourseMetadataValue` field name, `CourseDetails` attribute)
+COURSE_FILTERS = (
+    ('category', 'course_category'),
+    ('tag', 'vendor'),
+    ('country', 'course_country'),
+    ('language', 'language'),
+    ('learning_group', 'enrollment_learning_groups'),
+)
+VALUE_MAX_LENGTH = CourseMetadataValue._meta.get_field('value').max_length
+
+
+def get_values(value):
+    """
+    Returns the indexed values of an attribute, which holds one value or a list of them.
+    """
+    values = value if isinstance(value, (list, tuple, set)) else [value]
+    return sorted(set(unicode(value).strip()[:VALUE_MAX_LENGTH] for value in values if value not in (None, '')))
+
+
+def refresh_course_metadata(course_key):
+    """
+    Stores the current details of the course and its filterable values.
+    """
+    details = fetch_course_details(
+        course_key, COURSE_DETAILS_ATTRIBUTES + tuple(attr for __, attr in COURSE_FILTERS)
+    )
+    with transaction.atomic():
+        course_metadata, __ = CourseMetadata.objects.update_or_create(
+            course_id=course_key, defaults={'details': json.dumps(details, cls=JSONEncoder)}
+        )
+        CourseMetadataValue.objects.filter(course=course_metadata).delete()
+        CourseMetadataValue.objects.bulk_create([
+            CourseMetadataValue(course=course_metadata, field=field, value=value)
+            for field, attr in COURSE_FILTERS for value in get_values(details[attr])
+        ])
+    return course_metadata
+
+
+def delete_course_metadata(course_key):
+    CourseMetadata.objects.filter(course_id=course_key).delete()
+
+
+def get_courses_filter(query_params):
+    """
+    Returns the filters of course overviews matching the `category`, `tag`, `country`, `language` and
+    `learning_group` query parameters, each of them a comma separated list of values.
+    """
+    filters = []
+    for field, __ in COURSE_FILTERS:
+        values = [value.strip() for value in query_params.get(field, '').split(',') if value.strip()]
+        if values:
+            filters.append({'id__in': CourseMetadataValue.objects.filter(
+                field=field, value__in=values
+            ).values('course_id')})
+    return filters
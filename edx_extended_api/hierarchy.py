@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Index of the supervisors hierarchy, built from the `lt_supervisor` field of the profiles.
+"""
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from .models import UserHierarchy
+
+
+User = get_user_model()
+
+# Lookup of the user value that reports put in their `lt_supervisor` field, e.g. `email` or `profile__lt_employee_id`.
+SUPERVISOR_IDENTITY_FIELD = getattr(settings, 'EDX_EXTENDED_API_SUPERVISOR_IDENTITY_FIELD', 'username')
+
+
+def _get_users(**filters):
+    """
+    Returns `{user_id: (org, identity, supervisor)}` of the matching users.
+    """
+    return {
+        user_id: (org, identity, supervisor or None)
+        for user_id, org, identity, supervisor in User.objects.filter(**filters).values_list(
+            'id', 'profile__org', SUPERVISOR_IDENTITY_FIELD, 'profile__lt_supervisor'
+        )
+    }
+
+
+def get_direct_supervisor(user_id):
+    """
+    Returns the direct supervisor stored in the index for the user.
+    """
+    return UserHierarchy.objects.filter(user_id=user_id, depth=1).values_list('supervisor', flat=True).first()
+
+
+def rebuild_user_hierarchy(user_ids):
+    """
+    Recomputes the supervisors of the given users and of all their reports, with a fixed number of queries.
+
+    Supervisors are resolved within the organization of the user. Chains going through users
+    that are not rebuilt reuse their stored supervisors, and cycles are cut.
+    """
+    users = _get_users(id__in=user_ids) if user_ids else {}
+    if not users:
+        return
+    identities = set(identity for __, identity, __ in users.values() if identity)
+    report_ids = set(UserHierarchy.objects.filter(supervisor__in=identities).values_list('user_id', flat=True))
+    if report_ids - set(users):
+        users.update(_get_users(id__in=report_ids - set(users)))
+
+    by_identity = {(org, identity): user_id for user_id, (org, identity, __) in users.items() if identity}
+    unresolved = set((org, supervisor) for org, __, supervisor in users.values() if supervisor) - set(by_identity)
+    stored_chains = {}
+    if unresolved:
+        supervisors = _get_users(**{
+            SUPERVISOR_IDENTITY_FIELD + '__in': set(supervisor for __, supervisor in unresolved),
+            'profile__org__in': set(org for org, __ in unresolved),
+        })
+        for user_id, (org, identity, __) in supervisors.items():
+            if (org, identity) in unresolved:
+                by_identity[(org, identity)] = user_id
+                stored_chains[user_id] = []
+        for user_id, supervisor in UserHierarchy.objects.filter(
+                user_id__in=stored_chains.keys()).order_by('depth').values_list('user_id', 'supervisor'):
+            stored_chains[user_id].append(supervisor)
+
+    def get_chain(user_id):
+        chain, visited, current_id = [], set(), user_id
+        while current_id is not None and current_id not in visited:
+            if current_id in stored_chains:
+                chain.extend(stored_chains[current_id])
+                break
+            visited.add(current_id)
+            org, __, supervisor = users[current_id]
+            if not supervisor:
+                break
+            chain.append(supervisor)
+            current_id = by_identity.get((org, supervisor))
+        identity = users[user_id][1]
+        if identity in chain:
+            chain = chain[:chain.index(identity)]
+        return [supervisor for index, supervisor in enumerate(chain) if supervisor not in chain[:index]]
+
+    with transaction.atomic():
+        UserHierarchy.objects.filter(user_id__in=users.keys()).delete()
+        UserHierarchy.objects.bulk_create([
+            UserHierarchy(user_id=user_id, supervisor=supervisor, depth=depth)
+            for user_id in users for depth, supervisor in enumerate(get_chain(user_id), 1)
+        ], batch_size=1000)
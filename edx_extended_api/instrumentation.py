@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Per-request instrumentation of the API: SQL queries, `CourseDetails` fetches and serialization time.
+"""
+from __future__ import unicode_literals
+
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+log = logging.getLogger(__name__)
+
+INSTRUMENTATION_ENABLED = getattr(settings, 'EDX_EXTENDED_API_INSTRUMENTATION', False)
+INSTRUMENTATION_HEADER = 'HTTP_X_INSTRUMENTATION'
+
+_local = threading.local()
+
+
+def get_current():
+    """
+    Returns the instrumentation of the request being processed by the current thread, if any.
+    """
+    return getattr(_local, 'instrumentation', None)
+
+
+def record(name, duration):
+    """
+    Counts one `name` operation which took `duration` seconds, when the current request is instrumented.
+    """
+    instrumentation = get_current()
+    if instrumentation is not None:
+        instrumentation.counts[name] += 1
+        instrumentation.durations[name] += duration
+
+
+def timed(name, func):
+    """
+    Wraps `func` to record its calls under `name`.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.time()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            record(name, time.time() - start)
+    return wrapper
+
+
+class Instrumentation(object):
+    """
+    Context manager collecting the measures of one request.
+    """
+
+    def __init__(self):
+        self.counts = defaultdict(int)
+        self.durations = defaultdict(float)
+        self.queries = CaptureQueriesContext(connection)
+        self.start = self.total = 0
+
+    def __enter__(self):
+        self.start = time.time()
+        self.queries.__enter__()
+        _local.instrumentation = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _local.instrumentation = None
+        self.queries.__exit__(exc_type, exc_value, traceback)
+        self.total = time.time() - self.start
+
+    @property
+    def query_count(self):
+        return len(self.queries)
+
+    @property
+    def db_time(self):
+        return sum(float(query['time']) for query in self.queries.captured_queries)
+
+    def get_measures(self):
+        """
+        Returns `{name: (count, duration in ms)}` of the request.
+        """
+        measures = {'db': (self.query_count, self.db_time * 1000), 'total': (1, self.total * 1000)}
+        for name, count in self.counts.items():
+            measures[name] = (count, self.durations[name] * 1000)
+        return measures
+
+    def add_headers(self, response):
+        response['X-Query-Count'] = self.query_count
+        response['Server-Timing'] = ', '.join(
+            '{};desc="{} {}";dur={:.1f}'.format(name, count, 'queries' if name == 'db' else 'calls', duration)
+            for name, (count, duration) in sorted(self.get_measures().items())
+        )
+
+    def log(self, request, response, view):
+        log.info('edx_extended_api request %s', json.dumps({
+            'method': request.method,
+            'path': request.get_full_path(),
+            'view': view.__class__.__name__,
+            'action': getattr(view, 'action', None),
+            'status': response.status_code,
+            'user_id': getattr(request.user, 'id', None),
+            'measures': {
+                name: {'count': count, 'ms': round(duration, 1)}
+                for name, (count, duration) in self.get_measures().items()
+            },
+        }, sort_keys=True))
+
+
+def is_requested(request):
+    """
+    Returns whether the request is instrumented: every request when `EDX_EXTENDED_API_INSTRUMENTATION` is set,
+    otherwise those of staff users sending the `X-Instrumentation: 1` header.
+
+    The request user must be authenticated already.
+    """
+    return INSTRUMENTATION_ENABLED or (
+        request.META.get(INSTRUMENTATION_HEADER) == '1' and getattr(request.user, 'is_staff', False)
+    )
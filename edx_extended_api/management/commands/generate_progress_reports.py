@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Generates progress reports of the learners of the sites, meant to be run on a schedule, e.g. by cron:
+
+    ./manage.py lms generate_progress_reports --format csv
+"""
+from __future__ import unicode_literals
+
+import json
+
+from django.core.management.base import BaseCommand
+from openedx.core.djangoapps.site_configuration.models import SiteConfiguration
+
+from edx_extended_api.models import ProgressReportJob
+from edx_extended_api.tasks import generate_progress_report
+
+
+def get_sites_orgs():
+    """
+    Returns the organizations lists of the enabled site configurations.
+    """
+    sites_orgs = []
+    for site_configuration in SiteConfiguration.objects.filter(enabled=True):
+        orgs = site_configuration.get_value('course_org_filter') or []
+        orgs = [orgs] if isinstance(orgs, basestring) else list(orgs)
+        if orgs:
+            sites_orgs.append(orgs)
+    return sites_orgs
+
+
+class Command(BaseCommand):
+    help = 'Generates progress reports of all the learners, one report per site.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--org', action='append', dest='orgs', default=[],
+            help='Organization of the learners to report on, can be repeated to make one report of several '
+                 'organizations. Defaults to one report per enabled site, of the site organizations.'
+        )
+        parser.add_argument(
+            '--format', dest='export_format', default=ProgressReportJob.NDJSON,
+            choices=[choice for choice, __ in ProgressReportJob.FORMAT_CHOICES]
+        )
+        parser.add_argument(
+            '--async', action='store_true', dest='run_async',
+            help='Queue the reports to celery instead of generating them within the command.'
+        )
+
+    def handle(self, *args, **options):
+        for orgs in [options['orgs']] if options['orgs'] else get_sites_orgs():
+            job = ProgressReportJob.objects.create(
+                org=orgs[0],
+                orgs=json.dumps(orgs),
+                export_format=options['export_format'],
+                scheduled=True
+            )
+            if options['run_async']:
+                generate_progress_report.delay(job.id)
+                self.stdout.write('Progress report job {} of {} queued.'.format(job.id, ', '.join(orgs)))
+            else:
+                try:
+                    generate_progress_report(job.id)
+                except Exception:  # pylint: disable=broad-except
+                    # The job is marked as failed by the task, the reports of the other sites still run.
+                    pass
+                job.refresh_from_db()
+                self.stdout.write('Progress report job {} of {}: {} {}'.format(
+                    job.id, ', '.join(orgs), job.status, job.file_name
+                ))
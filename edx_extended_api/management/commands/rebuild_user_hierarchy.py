@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+Rebuilds the supervisors hierarchy index, e.g. after installing the plugin or changing
+`EDX_EXTENDED_API_SUPERVISOR_IDENTITY_FIELD`:
+
+    ./manage.py lms rebuild_user_hierarchy --org FooOrg
+"""
+from __future__ import unicode_literals
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from student.models import UserProfile
+
+from edx_extended_api.hierarchy import rebuild_user_hierarchy
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the supervisors hierarchy index of the users, organization by organization.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--org', action='append', dest='orgs', default=[],
+            help='Organization to rebuild, can be repeated. Defaults to all organizations.'
+        )
+
+    def handle(self, *args, **options):
+        orgs = options['orgs'] or sorted(
+            UserProfile.objects.exclude(org=None).exclude(org='').values_list('org', flat=True).distinct()
+        )
+        for org in orgs:
+            user_ids = list(User.objects.filter(profile__org=org).values_list('id', flat=True))
+            rebuild_user_hierarchy(user_ids)
+            self.stdout.write('Hierarchy of {} users of {} rebuilt.'.format(len(user_ids), org))
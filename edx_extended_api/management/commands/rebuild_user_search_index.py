@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+Rebuilds the users search index, e.g. after installing the plugin:
+
+    ./manage.py lms rebuild_user_search_index --org FooOrg
+"""
+from __future__ import unicode_literals
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from student.models import UserProfile
+
+from edx_extended_api.search import index_users
+
+
+User = get_user_model()
+
+CHUNK_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the search index of the users, organization by organization.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--org', action='append', dest='orgs', default=[],
+            help='Organization to rebuild, can be repeated. Defaults to all organizations.'
+        )
+
+    def handle(self, *args, **options):
+        orgs = options['orgs'] or sorted(
+            UserProfile.objects.exclude(org=None).exclude(org='').values_list('org', flat=True).distinct()
+        )
+        for org in orgs:
+            user_ids = list(User.objects.filter(profile__org=org).order_by('id').values_list('id', flat=True))
+            for start in range(0, len(user_ids), CHUNK_SIZE):
+                index_users(user_ids[start:start + CHUNK_SIZE])
+            self.stdout.write('Search index of {} users of {} rebuilt.'.format(len(user_ids), org))
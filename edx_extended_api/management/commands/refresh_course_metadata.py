@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+Stores the details of the courses read by the API, e.g. after installing the plugin or when
+a course was published while the plugin was not installed in studio:
+
+    ./manage.py lms refresh_course_metadata --org FooOrg
+"""
+from __future__ import unicode_literals
+
+from django.core.management.base import BaseCommand
+from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
+
+from edx_extended_api.course_metadata import refresh_course_metadata
+
+
+class Command(BaseCommand):
+    help = 'Refreshes the stored details of the courses from the modulestore.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--org', action='append', dest='orgs', default=[],
+            help='Organization of the courses to refresh, can be repeated. Defaults to all courses.'
+        )
+
+    def handle(self, *args, **options):
+        course_overviews = CourseOverview.objects.all()
+        if options['orgs']:
+            course_overviews = course_overviews.filter(org__in=options['orgs'])
+        refreshed = 0
+        for course_key in course_overviews.order_by('id').values_list('id', flat=True):
+            try:
+                refresh_course_metadata(course_key)
+                refreshed += 1
+            except Exception as error:  # pylint: disable=broad-except
+                self.stderr.write('Unable to refresh course {}: {}'.format(course_key, error))
+        self.stdout.write('Metadata of {} courses refreshed.'.format(refreshed))
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+Metrics of the API, exposed in Prometheus text format.
+
+Metrics are kept in the Django cache named by `EDX_EXTENDED_API_METRICS_CACHE` (`default`), so every
+LMS worker process updates the same counters and any of them renders the aggregate. The cache must
+be shared by the processes, e.g. memcached, and metrics are reset when it is flushed or evicts them.
+"""
+from __future__ import unicode_literals
+
+import hashlib
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.encoding import force_bytes
+
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (1, 5, 10, 50, 100, 500, 1000, 5000, 10000)
+
+METRICS = {
+    'edx_extended_api_requests_total': ('counter', 'Requests by viewset, action, method and HTTP status.'),
+    'edx_extended_api_request_duration_seconds': ('histogram', 'Request duration by viewset and action.'),
+    'edx_extended_api_rows_returned': ('histogram', 'Rows returned by a response, by viewset and action.'),
+    'edx_extended_api_bulk_batch_size': ('histogram', 'Items sent in a bulk request, by viewset and action.'),
+    'edx_extended_api_item_statuses_total': ('counter', 'Statuses of the items returned, e.g. user_not_found.'),
+}
+
+METRICS_CACHE = getattr(settings, 'EDX_EXTENDED_API_METRICS_CACHE', 'default')
+KEY_PREFIX = 'edx_extended_api.metrics.'
+# Cache counters are integers, histogram sums are stored in millionths.
+SUM_SCALE = 1000000
+
+
+def _format_labels(labels):
+    return '{' + ','.join(
+        '{}="{}"'.format(name, unicode(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    ) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else unicode(int(value))
+
+
+class Registry(object):
+    """
+    Store of counters and histograms shared by the processes, identified by metric name and sorted labels.
+
+    Each series is registered once in numbered slots, allocated with atomic cache increments,
+    so any process can list them. Values are only changed with atomic cache increments too,
+    one or two cache calls per update.
+    """
+
+    @property
+    def cache(self):
+        return caches[METRICS_CACHE]
+
+    def _key(self, *parts):
+        return KEY_PREFIX + hashlib.md5(force_bytes(repr(parts))).hexdigest()
+
+    def _incr(self, key, value):
+        """
+        Increments the value of the key, returns whether it existed already.
+        """
+        try:
+            self.cache.incr(key, value)
+            return True
+        except ValueError:
+            if self.cache.add(key, value, None):
+                return False
+            self.cache.incr(key, value)
+            return True
+
+    def _register(self, series):
+        registered_key = self._key('registered', series)
+        if not self.cache.add(registered_key, True, None):
+            return
+        self.cache.add(KEY_PREFIX + 'slots', 0, None)
+        try:
+            slot = self.cache.incr(KEY_PREFIX + 'slots')
+        except ValueError:  # Evicted in between, the next update registers the series.
+            self.cache.delete(registered_key)
+            return
+        self.cache.set('{}slot.{}'.format(KEY_PREFIX, slot), series, None)
+
+    def _series(self, metric_type, name, labels, buckets=None):
+        return (metric_type, name, tuple(sorted((label, unicode(value)) for label, value in labels.items())), buckets)
+
+    def inc(self, name, labels, value=1):
+        series = self._series('counter', name, labels)
+        # Series are registered when their value is created, at first or once the cache was flushed.
+        if not self._incr(self._key(series), int(value)):
+            self._register(series)
+
+    def observe(self, name, labels, value, buckets=LATENCY_BUCKETS):
+        series = self._series('histogram', name, labels, tuple(buckets))
+        # Counts are stored per bucket and made cumulative when rendered.
+        bucket = next((bound for bound in buckets if value <= bound), '+Inf')
+        self._incr(self._key(series, bucket), 1)
+        if not self._incr(self._key(series, 'sum'), int(round(value * SUM_SCALE))):
+            self._register(series)
+
+    def get_series(self):
+        slots = self.cache.get(KEY_PREFIX + 'slots') or 0
+        slot_keys = ['{}slot.{}'.format(KEY_PREFIX, slot) for slot in range(1, slots + 1)]
+        return slot_keys, sorted(set(self.cache.get_many(slot_keys).values()))
+
+    def clear(self):
+        slot_keys, all_series = self.get_series()
+        keys = slot_keys + [KEY_PREFIX + 'slots']
+        for series in all_series:
+            keys.extend([self._key('registered', series), self._key(series), self._key(series, 'sum')])
+            keys.extend(self._key(series, bucket) for bucket in (series[3] or ()) + ('+Inf',))
+        self.cache.delete_many(keys)
+
+    def render(self):
+        """
+        Returns the metrics in Prometheus text exposition format.
+        """
+        __, all_series = self.get_series()
+        keys = {}
+        for series in all_series:
+            if series[0] == 'counter':
+                keys[self._key(series)] = None
+            else:
+                keys[self._key(series, 'sum')] = None
+                keys.update((self._key(series, bucket), None) for bucket in series[3] + ('+Inf',))
+        values = self.cache.get_many(list(keys))
+
+        samples = defaultdict(list)
+        for metric_type, name, labels, buckets in all_series:
+            series = (metric_type, name, labels, buckets)
+            if metric_type == 'counter':
+                value = values.get(self._key(series), 0)
+                samples[name].append('{}{} {}'.format(name, _format_labels(labels), _format_value(value)))
+                continue
+            count = 0
+            for bound in buckets + ('+Inf',):
+                count += values.get(self._key(series, bound), 0)
+                le = bound if bound == '+Inf' else _format_value(bound)
+                samples[name].append('{}_bucket{} {}'.format(name, _format_labels(labels + (('le', le),)), count))
+            total_sum = float(values.get(self._key(series, 'sum'), 0)) / SUM_SCALE
+            samples[name].append('{}_sum{} {}'.format(name, _format_labels(labels), _format_value(total_sum)))
+            samples[name].append('{}_count{} {}'.format(name, _format_labels(labels), count))
+
+        lines = []
+        for name in sorted(samples):
+            metric_type, help_text = METRICS.get(name, ('untyped', ''))
+            lines.append('# HELP {} {}'.format(name, help_text))
+            lines.append('# TYPE {} {}'.format(name, metric_type))
+            lines.extend(samples[name])
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
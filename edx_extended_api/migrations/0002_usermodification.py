@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('edx_extended_api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserModification',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='modification', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('modified', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import opaque_keys.edx.django.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('edx_extended_api', '0005_usersearchterm'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseMetadata',
+            fields=[
+                ('course_id', opaque_keys.edx.django.models.CourseKeyField(max_length=255, primary_key=True, serialize=False)),
+                ('details', models.TextField(default='{}', help_text='JSON of the course details attributes.')),
+                ('modified', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CourseMetadataValue',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(max_length=32)),
+                ('value', models.CharField(db_index=True, max_length=255)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='values', to='edx_extended_api.CourseMetadata')),
+            ],
+        ),
+    ]
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('edx_extended_api', '0006_coursemetadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coursemetadata',
+            name='site_prefix',
+            field=models.CharField(blank=True, default='', help_text='Prefix of the image URLs.', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='coursemetadata',
+            name='card_image_url',
+            field=models.CharField(blank=True, default='', max_length=1000),
+        ),
+        migrations.AddField(
+            model_name='coursemetadata',
+            name='banner_image_url',
+            field=models.CharField(blank=True, default='', max_length=1000),
+        ),
+    ]
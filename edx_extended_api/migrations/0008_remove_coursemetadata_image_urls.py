@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('edx_extended_api', '0007_coursemetadata_image_urls'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='coursemetadata',
+            name='site_prefix',
+        ),
+        migrations.RemoveField(
+            model_name='coursemetadata',
+            name='card_image_url',
+        ),
+        migrations.RemoveField(
+            model_name='coursemetadata',
+            name='banner_image_url',
+        ),
+    ]
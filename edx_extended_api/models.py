@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import json
+
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+from django.utils.encoding import python_2_unicode_compatible
+from opaque_keys.edx.django.models import CourseKeyField
+
+
+DEACTIVATE_STATUSES = {
+    True: 'user_deactivated',
+    False: 'user_already_inactive',
+    None: 'user_not_found'
+}
+
+
+class BaseJob(models.Model):
+    """
+    Job run in background by a celery task, restricted to the site organizations it was requested for.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    )
+
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=PENDING)
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name='+'
+    )
+    org = models.CharField(max_length=255, db_index=True, help_text='Organization of the user who requested the job.')
+    orgs = models.TextField(help_text='JSON list of the site organizations the job is restricted to.')
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    created = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField(auto_now=True)
+
+    class Meta(object):
+        abstract = True
+
+    def get_orgs(self):
+        return json.loads(self.orgs)
+
+    def set_status(self, status, error=''):
+        self.status = status
+        self.error = error
+        self.save(update_fields=['status', 'error', 'modified'])
+
+
+@python_2_unicode_compatible
+class DeactivationJob(BaseJob):
+    """
+    Deactivation of a list of users, processed by chunks.
+    """
+    LOOKUP_FIELD_CHOICES = (
+        ('id', 'User id'),
+        ('username', 'Username'),
+    )
+
+    lookup_field = models.CharField(max_length=16, choices=LOOKUP_FIELD_CHOICES)
+    users = models.TextField(help_text='JSON list of the ids or usernames of the users to deactivate.')
+
+    def __str__(self):
+        return 'Deactivation of {} users ({})'.format(self.total, self.status)
+
+    def get_users(self):
+        return json.loads(self.users)
+
+
+@python_2_unicode_compatible
+class ProgressReportJob(BaseJob):
+    """
+    Progress report of all the learners of the site organizations, written to a file.
+    """
+    NDJSON = 'ndjson'
+    CSV = 'csv'
+    FORMAT_CHOICES = (
+        (NDJSON, 'NDJSON'),
+        (CSV, 'CSV'),
+    )
+
+    export_format = models.CharField(max_length=16, choices=FORMAT_CHOICES, default=NDJSON)
+    file_name = models.CharField(max_length=255, blank=True, default='', help_text='Report file in reports storage.')
+    scheduled = models.BooleanField(default=False, help_text='Whether the job was started by a scheduled run.')
+
+    def __str__(self):
+        return 'Progress report of {} users ({})'.format(self.total, self.status)
+
+
+class DeactivationJobResult(models.Model):
+    """
+    Deactivation status of one user of a deactivation job.
+    """
+    job = models.ForeignKey(DeactivationJob, related_name='results', on_delete=models.CASCADE)
+    user_id = models.IntegerField(null=True)
+    username = models.CharField(max_length=150, blank=True, default='')
+    status = models.CharField(max_length=32)
+
+
+class UserModification(models.Model):
+    """
+    Last time a user, its profile or its groups were changed, used to list the users changed since a date.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, primary_key=True, related_name='modification', on_delete=models.CASCADE
+    )
+    modified = models.DateTimeField(db_index=True)
+
+    @classmethod
+    def touch(cls, user_ids):
+        """
+        Sets the modification date of the given users to now, with one update and one insert.
+        """
+        user_ids = set(user_ids)
+        if not user_ids:
+            return
+        now = timezone.now()
+        existing = set(cls.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True))
+        if existing:
+            cls.objects.filter(user_id__in=existing).update(modified=now)
+        missing = user_ids - existing
+        if not missing:
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.bulk_create([cls(user_id=user_id, modified=now) for user_id in missing], batch_size=1000)
+        except IntegrityError:
+            # Some rows were inserted concurrently.
+            for user_id in missing:
+                cls.objects.update_or_create(user_id=user_id, defaults={'modified': now})
+
+
+class UserHierarchy(models.Model):
+    """
+    Transitive supervisors of a user, as the values users put in their profile `lt_supervisor` field.
+
+    There is one row per supervisor up the chain, `depth` 1 being the direct supervisor,
+    so all the reports of a supervisor are found with one indexed query.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='supervisors', on_delete=models.CASCADE)
+    supervisor = models.CharField(max_length=255, db_index=True)
+    depth = models.PositiveSmallIntegerField()
+
+    class Meta(object):
+        unique_together = ('user', 'supervisor')
+
+
+class UserSearchTerm(models.Model):
+    """
+    Lowercased value of a searchable field of a user, e.g. its email or each word of its name.
+
+    Prefix searches are answered from the `term` index, the organization of the user is stored
+    with the term so they are scoped to the site organizations without joining the profiles.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='search_terms', on_delete=models.CASCADE)
+    org = models.CharField(max_length=255)
+    field = models.CharField(max_length=32)
+    term = models.CharField(max_length=255, db_index=True)
+
+
+class CourseMetadata(models.Model):
+    """
+    `CourseDetails` attributes of a course returned by the API, refreshed when the course is published.
+
+    Image asset paths are stored, the API prefixes them with the site prefix when serializing,
+    like the overview URL, so they follow a change of the site.
+    """
+    course_id = CourseKeyField(max_length=255, primary_key=True)
+    details = models.TextField(default='{}', help_text='JSON of the course details attributes.')
+    modified = models.DateTimeField(auto_now=True)
+
+    def get_details(self):
+        return json.loads(self.details)
+
+
+class CourseMetadataValue(models.Model):
+    """
+    One value of a filterable course attribute, e.g. a tag or a country, so courses are filtered with an indexed query.
+    """
+    course = models.ForeignKey(CourseMetadata, related_name='values', on_delete=models.CASCADE)
+    field = models.CharField(max_length=32)
+    value = models.CharField(max_length=255, db_index=True)
@@ -0,0 +1,18 @@
+from django.utils import six
+from rest_framework.pagination import CursorPagination
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    Keyset pagination ordered by id, with opaque cursors and without counting the rows.
+    """
+    ordering = 'id'
+    page_size = CursorPagination.page_size or 10
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def _get_position_from_instance(self, instance, ordering):
+        # Pages can also hold rows of `QuerySet.values()`.
+        if isinstance(instance, dict):
+            return six.text_type(instance[ordering[0].lstrip('-')])
+        return super(IdCursorPagination, self)._get_position_from_instance(instance, ordering)
@@ -1,5 +1,8 @@
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
 from rest_framework.permissions import IsAuthenticated
-from openedx.core.djangoapps.site_configuration import helpers as configuration_helpers
+
+from .utils import get_site_orgs
 
 
 class IsStaffAndOrgMember(IsAuthenticated):
@@ -10,7 +13,20 @@ class IsStaffAndOrgMember(IsAuthenticated):
     def has_permission(self, request, view):
         is_authenticated = super(IsStaffAndOrgMember, self).has_permission(request, view)
         if is_authenticated:
-            course_org_filter = configuration_helpers.get_current_site_orgs() or []
+            course_org_filter = get_site_orgs(request)
             is_admin = (request.user.is_staff and request.user.is_superuser)
             return (is_admin and request.user.profile.org and request.user.profile.org in course_org_filter)
         return False
+
+
+class IsMetricsScraperOrStaffAndOrgMember(IsStaffAndOrgMember):
+    """
+    Permission to check that the request has the metrics token in `X-Metrics-Token` header,
+    or that user is staff and member of site organization.
+    """
+
+    def has_permission(self, request, view):
+        token = getattr(settings, 'EDX_EXTENDED_API_METRICS_TOKEN', None)
+        if token and constant_time_compare(request.META.get('HTTP_X_METRICS_TOKEN', ''), token):
+            return True
+        return super(IsMetricsScraperOrStaffAndOrgMember, self).has_permission(request, view)
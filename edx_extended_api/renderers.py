@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Rendering of large API responses: faster JSON encoding and gzip / deflate compression.
+"""
+from __future__ import unicode_literals
+
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+FAST_JSON_ENABLED = getattr(settings, 'EDX_EXTENDED_API_FAST_JSON', True)
+COMPRESSION_MIN_SIZE = getattr(settings, 'EDX_EXTENDED_API_COMPRESSION_MIN_SIZE', 16 * 1024)
+COMPRESSORS = (
+    ('gzip', compress_string),
+    ('deflate', zlib.compress),
+)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Renders successful responses with ujson when it is installed.
+
+    Error responses, which may hold lazy translations, and indented output are rendered
+    by the DRF renderer, which is also used when ujson can't encode the data.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        renderer_context = renderer_context or {}
+        response = renderer_context.get('response')
+        if (ujson is None or not FAST_JSON_ENABLED or data is None or
+                (response is not None and response.status_code >= 400) or
+                self.get_indent(accepted_media_type, renderer_context)):
+            return super(FastJSONRenderer, self).render(data, accepted_media_type, renderer_context)
+        try:
+            ret = ujson.dumps(data, ensure_ascii=self.ensure_ascii, escape_forward_slashes=False, double_precision=15)
+        except (TypeError, ValueError, OverflowError):
+            return super(FastJSONRenderer, self).render(data, accepted_media_type, renderer_context)
+        # Same escaping as the DRF renderer, so the output can be embedded in javascript.
+        if isinstance(ret, bytes):
+            ret = ret.decode('utf-8')
+        return ret.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029').encode('utf-8')
+
+
+RENDERER_CLASSES = tuple(
+    FastJSONRenderer if renderer_class is JSONRenderer else renderer_class
+    for renderer_class in api_settings.DEFAULT_RENDERER_CLASSES
+)
+
+
+def get_accepted_encoding(request):
+    """
+    Returns the first of `gzip` and `deflate` accepted by the client, or `None`.
+    """
+    accepted = {}
+    for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        encoding, __, params = part.partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0
+        accepted[encoding.strip().lower()] = quality
+    for encoding, __ in COMPRESSORS:
+        if accepted.get(encoding, 0) > 0:
+            return encoding
+    return None
+
+
+def compress_response(request, response):
+    """
+    Compresses the rendered content of the response when it is large enough and the client accepts it.
+    """
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if COMPRESSION_MIN_SIZE is None or len(response.content) < COMPRESSION_MIN_SIZE:
+        return response
+    encoding = get_accepted_encoding(request)
+    if encoding is None or response.has_header('Content-Encoding'):
+        return response
+
+    response.content = dict(COMPRESSORS)[encoding](response.content)
+    response['Content-Encoding'] = encoding
+    response['Content-Length'] = str(len(response.content))
+    # The compressed content is another representation of the same data.
+    etag = response.get('ETag')
+    if etag and not etag.startswith('W/'):
+        response['ETag'] = 'W/' + etag
+    return response
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Index of the searchable fields of the users, for case insensitive prefix searches.
+"""
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Case, IntegerField, Max, Value, When
+
+from .models import UserSearchTerm
+
+
+User = get_user_model()
+
+# (field name, user lookup, weight), exact matches weigh twice as much as prefix matches.
+SEARCH_FIELDS = (
+    ('username', 'username', 5),
+    ('email', 'email', 4),
+    ('lt_employee_id', 'profile__lt_employee_id', 4),
+    ('name', 'profile__name', 3),
+    ('lt_department', 'profile__lt_department', 1),
+)
+# Fields also searchable from each of their words, e.g. the last name.
+SEARCH_WORDS_FIELDS = ('name', 'lt_department')
+SEARCH_MIN_LENGTH = getattr(settings, 'EDX_EXTENDED_API_SEARCH_MIN_LENGTH', 2)
+TERM_MAX_LENGTH = UserSearchTerm._meta.get_field('term').max_length
+
+
+def normalize(value):
+    return (value or '').strip().lower()[:TERM_MAX_LENGTH]
+
+
+def get_terms(field, value):
+    """
+    Returns the terms indexed for the value of the field.
+    """
+    value = normalize(value)
+    if not value:
+        return []
+    terms = [value]
+    if field in SEARCH_WORDS_FIELDS:
+        words = value.split()
+        terms.extend(' '.join(words[index:]) for index in range(1, len(words)))
+    return terms
+
+
+def index_users(user_ids):
+    """
+    Replaces the search terms of the given users, with a fixed number of queries.
+    """
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    lookups = [lookup for __, lookup, __ in SEARCH_FIELDS]
+    terms = []
+    for row in User.objects.filter(id__in=user_ids).exclude(profile=None).values('id', 'profile__org', *lookups):
+        for field, lookup, __ in SEARCH_FIELDS:
+            terms.extend(
+                UserSearchTerm(user_id=row['id'], org=row['profile__org'] or '', field=field, term=term)
+                for term in get_terms(field, row[lookup])
+            )
+    with transaction.atomic():
+        UserSearchTerm.objects.filter(user_id__in=user_ids).delete()
+        UserSearchTerm.objects.bulk_create(terms, batch_size=1000)
+
+
+def search_users(query, orgs):
+    """
+    Returns `{'user_id', 'rank'}` rows of the users of the organizations matching the query, best ranked first.
+
+    A user ranks with its best matching field. Terms are lowercased already, `istartswith` is used
+    because MySQL only uses the index for `LIKE` without `BINARY`.
+    """
+    query = normalize(query)
+    rank = Case(
+        *[
+            When(field=field, term=query, then=Value(weight * 2)) for field, __, weight in SEARCH_FIELDS
+        ] + [
+            When(field=field, then=Value(weight)) for field, __, weight in SEARCH_FIELDS
+        ],
+        default=Value(0), output_field=IntegerField()
+    )
+    return UserSearchTerm.objects.filter(
+        org__in=orgs, term__istartswith=query
+    ).values('user_id').annotate(rank=Max(rank)).order_by('-rank', 'user_id')
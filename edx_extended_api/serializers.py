@@ -1,54 +1,30 @@
 # -*- coding: utf-8 -*-
+import operator
+from collections import OrderedDict
+from functools import reduce
+
 from badges.utils import site_prefix
 from django.contrib.auth import get_user_model
-from django.contrib.auth.models import Group
+from django.db import models
+from django.db.models import Q
 from django.urls import reverse
 from student import triboo_groups
 from student.models import UserProfile
 from student.roles import STUDIO_ADMIN_ACCESS_GROUP
 from rest_framework.fields import empty
 from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
 from triboo_analytics.models import ANALYTICS_ACCESS_GROUP, ANALYTICS_LIMITED_ACCESS_GROUP
-from openedx.core.djangoapps.models.course_details import CourseDetails
 from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
 from triboo_analytics.models import LearnerCourseJsonReport, LearnerBadgeJsonReport, CourseStatus
 
-
-User = get_user_model()
-
-
-def get_or_create_and_add_group(user_instance, group_name):
-    group, _ = Group.objects.get_or_create(name=group_name)
-    user_instance.groups.add(group)
-
-
-def get_or_create_and_remove_group(user_instance, group_name):
-    group, _ = Group.objects.get_or_create(name=group_name)
-    user_instance.groups.remove(group)
+from .models import CourseMetadata, DeactivationJob, DeactivationJobResult, ProgressReportJob, UserModification
+from .utils import get_course_details, get_groups_ids
 
 
-def set_user_platform_role(platform_role, user):
-    if platform_role == 'Super Platform Admin':
-        user.is_superuser = True
-        user.is_staff = True
-    elif platform_role == 'Platform Admin':
-        user.is_superuser = False
-        user.is_staff = True
-    elif platform_role == 'Studio Admin':
-        user.is_superuser = False
-        user.is_staff = False
-        get_or_create_and_add_group(user, STUDIO_ADMIN_ACCESS_GROUP)
-    elif platform_role == 'Learner':
-        user.is_superuser = False
-        user.is_staff = False
-        get_or_create_and_remove_group(user, STUDIO_ADMIN_ACCESS_GROUP)
-    user.save()
+User = get_user_model()
 
 
-GROUP_ACTIONS = {
-    True: get_or_create_and_add_group,
-    False: get_or_create_and_remove_group,
-}
 ACCESSES_NAMES = {
     'internal_catalog_access': triboo_groups.CATALOG_DENIED_GROUP,
     'edflex_catalog_access': triboo_groups.EDFLEX_DENIED_GROUP,
@@ -56,6 +32,106 @@ ACCESSES_NAMES = {
     'anderspink_catalog_access': triboo_groups.ANDERSPINK_DENIED_GROUP,
     'learnlight_catalog_access': triboo_groups.LEARNLIGHT_DENIED_GROUP
 }
+PLATFORM_ROLES_FLAGS = {
+    'Super Platform Admin': {'is_superuser': True, 'is_staff': True},
+    'Platform Admin': {'is_superuser': False, 'is_staff': True},
+    'Studio Admin': {'is_superuser': False, 'is_staff': False},
+    'Learner': {'is_superuser': False, 'is_staff': False},
+}
+USER_ACCESS_FIELDS = {'analytics_access', 'platform_role'} | set(ACCESSES_NAMES)
+USER_ACCESS_GROUPS = (
+    ANALYTICS_ACCESS_GROUP, ANALYTICS_LIMITED_ACCESS_GROUP, STUDIO_ADMIN_ACCESS_GROUP
+) + tuple(ACCESSES_NAMES.values())
+
+
+def pop_user_accesses(validated_data, default_platform_role=None):
+    """
+    Pops profile and accesses data out of the validated user data.
+
+    Returns `(profile_data, analytics_access, platform_role, accesses_dict)`, `analytics_access` is `False`
+    when it is not passed.
+    """
+    profile_data = validated_data.pop('profile', {})
+    analytics_access = validated_data.pop('analytics_access', False)
+    platform_role = validated_data.pop('platform_role', default_platform_role)
+    accesses_dict = {name: validated_data.pop(name) for name in ACCESSES_NAMES if name in validated_data}
+    return profile_data, analytics_access, platform_role, accesses_dict
+
+
+def get_group_changes(analytics_access=False, platform_role=None, accesses_dict=None):
+    """
+    Returns `(groups_to_add, groups_to_remove)` names matching the given accesses.
+    """
+    groups_to_add, groups_to_remove = set(), set()
+    if analytics_access == 'Restricted':
+        groups_to_add.add(ANALYTICS_LIMITED_ACCESS_GROUP)
+        groups_to_remove.add(ANALYTICS_ACCESS_GROUP)
+    elif analytics_access == 'Full Access':
+        groups_to_add.add(ANALYTICS_ACCESS_GROUP)
+        groups_to_remove.add(ANALYTICS_LIMITED_ACCESS_GROUP)
+    elif analytics_access is None:
+        groups_to_remove.update((ANALYTICS_ACCESS_GROUP, ANALYTICS_LIMITED_ACCESS_GROUP))
+
+    if platform_role == 'Studio Admin':
+        groups_to_add.add(STUDIO_ADMIN_ACCESS_GROUP)
+    elif platform_role == 'Learner':
+        groups_to_remove.add(STUDIO_ADMIN_ACCESS_GROUP)
+
+    for name, value in (accesses_dict or {}).items():
+        (groups_to_add if value else groups_to_remove).add(ACCESSES_NAMES[name])
+    return groups_to_add, groups_to_remove
+
+
+def apply_users_group_changes(users_group_changes):
+    """
+    Applies `{user_id: (groups_to_add, groups_to_remove)}` group changes to many users at once.
+
+    Only the memberships that really change are inserted or deleted, and only the users
+    whose memberships changed are marked as modified.
+    """
+    group_names = set()
+    for groups_to_add, groups_to_remove in users_group_changes.values():
+        group_names.update(groups_to_add, groups_to_remove)
+    if not group_names:
+        return
+    groups_ids = get_groups_ids(group_names)
+    memberships = User.groups.through.objects
+    existing = set(memberships.filter(
+        user_id__in=users_group_changes.keys(), group_id__in=groups_ids.values()
+    ).values_list('user_id', 'group_id'))
+
+    new_memberships, removed_memberships = [], {}
+    for user_id, (groups_to_add, groups_to_remove) in users_group_changes.items():
+        for group_name in groups_to_add:
+            if (user_id, groups_ids[group_name]) not in existing:
+                new_memberships.append(User.groups.through(user_id=user_id, group_id=groups_ids[group_name]))
+        for group_name in groups_to_remove - groups_to_add:
+            if (user_id, groups_ids[group_name]) in existing:
+                removed_memberships.setdefault(groups_ids[group_name], []).append(user_id)
+
+    if new_memberships:
+        memberships.bulk_create(new_memberships, batch_size=1000)
+    if removed_memberships:
+        memberships.filter(reduce(operator.or_, [
+            Q(group_id=group_id, user_id__in=user_ids) for group_id, user_ids in removed_memberships.items()
+        ])).delete()
+    UserModification.touch(
+        [membership.user_id for membership in new_memberships] +
+        [user_id for user_ids in removed_memberships.values() for user_id in user_ids]
+    )
+
+
+def get_users_groups_map(user_ids):
+    """
+    Returns `{user_id: set(group_names)}` with the access groups of the given users, loaded with one query.
+    """
+    users_groups = {user_id: set() for user_id in user_ids}
+    memberships = User.groups.through.objects.filter(
+        user_id__in=user_ids, group__name__in=USER_ACCESS_GROUPS
+    ).values_list('user_id', 'group__name')
+    for user_id, group_name in memberships:
+        users_groups[user_id].add(group_name)
+    return users_groups
 
 
 class CharSerializerMethodField(serializers.SerializerMethodField):
@@ -123,6 +199,115 @@ class BooleanSerializerMethodField(serializers.SerializerMethodField):
         self.fail('invalid', input=data)
 
 
+def get_sparse_fieldset(request):
+    """
+    Returns names of the fields requested with `fields` and excluded with `exclude` query parameters.
+    """
+    requested = set(f.strip() for f in request.query_params.get('fields', '').split(',') if f.strip())
+    excluded = set(f.strip() for f in request.query_params.get('exclude', '').split(',') if f.strip())
+    return requested, excluded
+
+
+def is_compact(request):
+    """
+    Returns whether `compact` query parameter asks to drop null values from the output.
+    """
+    return request is not None and request.query_params.get('compact', '').lower() in ('1', 'true')
+
+
+class SparseFieldsetMixin(object):
+    """
+    Drops the fields that are not requested with `fields` / `exclude` query parameters of GET requests.
+    """
+    # Model columns read by method fields, which have no `source` to derive them from.
+    method_fields_columns = {}
+
+    def get_fields(self):
+        fields = super(SparseFieldsetMixin, self).get_fields()
+        request = self.context.get('request', None)
+        if request is None or getattr(request, 'method', None) != 'GET':
+            return fields
+        requested, excluded = get_sparse_fieldset(request)
+        for field_name in list(fields):
+            if (requested and field_name not in requested) or field_name in excluded:
+                fields.pop(field_name)
+        return fields
+
+    def get_columns(self):
+        """
+        Returns lookups of the model columns read by the kept fields.
+        """
+        columns = {'id'}
+        for field_name, field in self.fields.items():
+            if field.source == '*':
+                columns.update(self.method_fields_columns.get(field_name, ()))
+            else:
+                columns.add(field.source.replace('.', '__'))
+        return columns
+
+
+class ValuesRow(dict):
+    """
+    Row of `QuerySet.values()` whose columns can also be read as attributes, as method fields do.
+    """
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+class ValuesSerializerMixin(object):
+    """
+    Serializes rows of `QuerySet.values()` instead of model instances.
+
+    The readable fields are compiled once into `(field_name, column, to_representation)` entries,
+    so rows are serialized without binding fields or traversing `source` attributes,
+    with the same output as `to_representation` of model instances.
+    Null values are dropped when `compact` query parameter is set.
+    """
+
+    def get_values_map(self):
+        if not hasattr(self, '_values_map'):
+            self._values_map = [
+                (field_name, None if field.source == '*' else field.source.replace('.', '__'), field.to_representation)
+                for field_name, field in self.fields.items() if not field.write_only
+            ]
+        return self._values_map
+
+    def values_to_representation(self, rows):
+        values_map = self.get_values_map()
+        compact = is_compact(self.context.get('request'))
+        data = []
+        for row in rows:
+            row = ValuesRow(row)
+            ret = OrderedDict()
+            for field_name, column, to_representation in values_map:
+                if column is None:
+                    value = to_representation(row)
+                else:
+                    value = row[column]
+                    if value is not None:
+                        value = to_representation(value)
+                if value is not None or not compact:
+                    ret[field_name] = value
+            data.append(ret)
+        return data
+
+
+class UserListSerializer(serializers.ListSerializer):
+    """
+    Loads access groups of all listed users at once, so the access fields don't query per user.
+    """
+
+    def to_representation(self, data):
+        users = list(data.all() if isinstance(data, models.Manager) else data)
+        if USER_ACCESS_FIELDS.intersection(self.child.fields):
+            self.context.setdefault('users_groups', {}).update(get_users_groups_map([user.id for user in users]))
+        return [self.child.to_representation(user) for user in users]
+
+
 class UserProfileSerializer(serializers.ModelSerializer):
 
     class Meta(object):
@@ -187,6 +372,7 @@ class UserSerializer(serializers.ModelSerializer):
             'internal_catalog_access', 'edflex_catalog_access', 'crehana_catalog_access', 'anderspink_catalog_access',
             'learnlight_catalog_access', 'platform_role'
         )
+        list_serializer_class = UserListSerializer
 
     def get_fields(self):
         fields = super(UserSerializer, self).get_fields()
@@ -196,15 +382,27 @@ class UserSerializer(serializers.ModelSerializer):
             fields['first_name'].required = True
             fields['last_name'].required = True
             fields['name'].required = True
+        if self.context.get('bulk'):
+            # Usernames of a batch are checked against existing users with one query by the view.
+            fields['username'].validators = [
+                validator for validator in fields['username'].validators if not isinstance(validator, UniqueValidator)
+            ]
         return fields
 
+    def get_user_groups(self, user):
+        """
+        Returns names of the access groups of the user, using the groups loaded for the serialized users.
+        """
+        users_groups = self.context.setdefault('users_groups', {})
+        if user.id not in users_groups:
+            users_groups.update(get_users_groups_map([user.id]))
+        return users_groups[user.id]
+
     def get_analytics_access(self, user):
-        user_groups = user.groups.all()
-        if not user_groups:
-            return None
-        if user.groups.filter(name=ANALYTICS_LIMITED_ACCESS_GROUP).exists():
+        user_groups = self.get_user_groups(user)
+        if ANALYTICS_LIMITED_ACCESS_GROUP in user_groups:
             return "Restricted"
-        if user.groups.filter(name=ANALYTICS_ACCESS_GROUP).exists():
+        if ANALYTICS_ACCESS_GROUP in user_groups:
             return "Full Access"
 
     def get_platform_role(self, user):
@@ -212,90 +410,83 @@ class UserSerializer(serializers.ModelSerializer):
             return 'Super Platform Admin'
         elif user.is_staff:
             return 'Platform Admin'
-        elif user.groups.filter(name=STUDIO_ADMIN_ACCESS_GROUP).exists():
+        elif STUDIO_ADMIN_ACCESS_GROUP in self.get_user_groups(user):
             return 'Studio Admin'
         else:
             return 'Learner'
 
     def get_internal_catalog_access(self, user):
-        return True if user.groups.filter(name=triboo_groups.CATALOG_DENIED_GROUP).exists() else False
+        return triboo_groups.CATALOG_DENIED_GROUP in self.get_user_groups(user)
 
     def get_edflex_catalog_access(self, user):
-        return True if user.groups.filter(name=triboo_groups.EDFLEX_DENIED_GROUP).exists() else False
+        return triboo_groups.EDFLEX_DENIED_GROUP in self.get_user_groups(user)
 
     def get_crehana_catalog_access(self, user):
-        return True if user.groups.filter(name=triboo_groups.CREHANA_DENIED_GROUP).exists() else False
+        return triboo_groups.CREHANA_DENIED_GROUP in self.get_user_groups(user)
 
     def get_anderspink_catalog_access(self, user):
-        return True if user.groups.filter(name=triboo_groups.ANDERSPINK_DENIED_GROUP).exists() else False
+        return triboo_groups.ANDERSPINK_DENIED_GROUP in self.get_user_groups(user)
 
     def get_learnlight_catalog_access(self, user):
-        return True if user.groups.filter(name=triboo_groups.LEARNLIGHT_DENIED_GROUP).exists() else False
+        return triboo_groups.LEARNLIGHT_DENIED_GROUP in self.get_user_groups(user)
 
     def create(self, validated_data):
-        profile_data = validated_data.pop('profile', {})
-        accesses_dict = {}
-        validated_data_keys = validated_data.keys()
-        analytics_access = validated_data.pop('analytics_access', False)
-        platform_role = validated_data.pop('platform_role', 'Learner')
-
-        for name, _ in ACCESSES_NAMES.items():
-            if name in validated_data_keys:
-                accesses_dict.update({
-                    name: validated_data.pop(name)
-                })
+        profile_data, analytics_access, platform_role, accesses_dict = pop_user_accesses(validated_data, 'Learner')
+        validated_data.update(PLATFORM_ROLES_FLAGS.get(platform_role, {}))
 
         user = User.objects.create(**validated_data)
-
-        if analytics_access == 'Restricted':
-            get_or_create_and_add_group(user, ANALYTICS_LIMITED_ACCESS_GROUP)
-        elif analytics_access == 'Full Access':
-            get_or_create_and_add_group(user, ANALYTICS_ACCESS_GROUP)
-
-        set_user_platform_role(platform_role, user)
-
-        [GROUP_ACTIONS[value](user, ACCESSES_NAMES[key]) for key, value in accesses_dict.items()]
-
+        apply_users_group_changes({user.id: get_group_changes(analytics_access, platform_role, accesses_dict)})
         UserProfile.objects.create(user=user, **profile_data)
         return user
 
     def update(self, instance, validated_data):
-        profile_data = validated_data.pop('profile', {})
-        accesses_dict = {}
-        validated_data_keys = validated_data.keys()
-        analytics_access = validated_data.pop('analytics_access', False)
-        platform_role = validated_data.pop('platform_role', None)
-
-        for name, _ in ACCESSES_NAMES.items():
-            if name in validated_data_keys:
-                accesses_dict.update({
-                    name: validated_data.pop(name)
-                })
-
-        if analytics_access == 'Restricted':
-            get_or_create_and_remove_group(instance, ANALYTICS_ACCESS_GROUP)
-            get_or_create_and_add_group(instance, ANALYTICS_LIMITED_ACCESS_GROUP)
-        elif analytics_access == 'Full Access':
-            get_or_create_and_remove_group(instance, ANALYTICS_LIMITED_ACCESS_GROUP)
-            get_or_create_and_add_group(instance, ANALYTICS_ACCESS_GROUP)
-        elif analytics_access is None:
-            get_or_create_and_remove_group(instance, ANALYTICS_LIMITED_ACCESS_GROUP)
-            get_or_create_and_remove_group(instance, ANALYTICS_ACCESS_GROUP)
-
-        set_user_platform_role(platform_role, user)
-
-        [GROUP_ACTIONS[value](instance, ACCESSES_NAMES[key]) for key, value in accesses_dict.items()]
-        User.objects.update_or_create(id=instance.id, defaults=validated_data)
+        profile_data, analytics_access, platform_role, accesses_dict = pop_user_accesses(validated_data)
+        validated_data.update(PLATFORM_ROLES_FLAGS.get(platform_role, {}))
+
+        apply_users_group_changes({instance.id: get_group_changes(analytics_access, platform_role, accesses_dict)})
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save()
         UserProfile.objects.update_or_create(user=instance, defaults=profile_data)
         return instance
 
 
-class RetrieveListUserSerializer(UserSerializer):
+class RetrieveListUserSerializer(ValuesSerializerMixin, SparseFieldsetMixin, UserSerializer):
     user_id = serializers.IntegerField(source='id')
+    method_fields_columns = {'platform_role': ('is_staff', 'is_superuser')}
 
     class Meta(object):
         model = User
         fields = UserSerializer.Meta.fields + ('user_id', 'is_active')
+        list_serializer_class = UserListSerializer
+
+    def values_to_representation(self, rows):
+        rows = list(rows)
+        if USER_ACCESS_FIELDS.intersection(self.fields):
+            self.context.setdefault('users_groups', {}).update(get_users_groups_map([row['id'] for row in rows]))
+        return super(RetrieveListUserSerializer, self).values_to_representation(rows)
+
+
+def load_courses_details(course_ids, context):
+    """
+    Loads the stored details of the given courses into the serializer context, with one query.
+
+    Courses without stored details are left out, their details are fetched from the modulestore.
+    """
+    courses_details = context.setdefault('courses_details', {})
+    for course_metadata in CourseMetadata.objects.filter(course_id__in=course_ids).only('course_id', 'details'):
+        courses_details[course_metadata.course_id] = course_metadata.get_details()
+
+
+class CourseListSerializer(serializers.ListSerializer):
+    """
+    Loads the details of all listed courses at once.
+    """
+
+    def to_representation(self, data):
+        courses = list(data.all() if isinstance(data, models.Manager) else data)
+        load_courses_details([course.id for course in courses], self.context)
+        return [self.child.to_representation(course) for course in courses]
 
 
 class CourseSerializer(serializers.ModelSerializer):
@@ -314,39 +505,89 @@ class CourseSerializer(serializers.ModelSerializer):
             'id', 'display_name', 'overview_url', 'start', 'card_image_url', 'banner_image_url', 'short_description',
             'instructors', 'effort', 'language', 'course_category', 'tags', 'countries', 'learning_groups', 'modified'
         )
+        list_serializer_class = CourseListSerializer
+
+    def get_site_prefix(self):
+        """
+        Returns the prefix of the course URLs, computed once for the serialized courses.
+        """
+        if 'site_prefix' not in self.context:
+            self.context['site_prefix'] = site_prefix()
+        return self.context['site_prefix']
 
     def get_overview_url(self, course):
         return u'{}{}'.format(
-            site_prefix(),
+            self.get_site_prefix(),
             reverse('about_course', kwargs={'course_id': unicode(course.id)})
         )
 
+    def get_course_details(self, course):
+        """
+        Returns details of the course, stored on publish or fetched once per course for the serialized courses.
+        """
+        courses_details = self.context.setdefault('courses_details', {})
+        if course.id not in courses_details:
+            courses_details[course.id] = get_course_details(course)
+        return courses_details[course.id]
+
     def get_card_image_url(self, course):
         return u'{}{}'.format(
-            site_prefix(),
-            CourseDetails.fetch(course.id).course_image_asset_path
+            self.get_site_prefix(),
+            self.get_course_details(course)['course_image_asset_path']
         )
 
     def get_banner_image_url(self, course):
         return u'{}{}'.format(
-            site_prefix(),
-            CourseDetails.fetch(course.id).banner_image_asset_path
+            self.get_site_prefix(),
+            self.get_course_details(course)['banner_image_asset_path']
         )
 
     def get_instructors(self, course):
-        return CourseDetails.fetch(course.id).instructor_info.get("instructors", [])
+        return self.get_course_details(course)['instructor_info'].get("instructors", [])
 
     def get_course_category(self, course):
-        return CourseDetails.fetch(course.id).course_category
+        return self.get_course_details(course)['course_category']
 
     def get_tags(self, course):
-        return CourseDetails.fetch(course.id).vendor
+        return self.get_course_details(course)['vendor']
 
     def get_countries(self, course):
-        return CourseDetails.fetch(course.id).course_country
+        return self.get_course_details(course)['course_country']
 
     def get_learning_groups(self, course):
-        return CourseDetails.fetch(course.id).enrollment_learning_groups
+        return self.get_course_details(course)['enrollment_learning_groups']
+
+
+def load_users_progress(user_ids, context):
+    """
+    Loads course reports of the given users with their course titles and badges into the serializer context.
+
+    Runs a fixed number of queries whatever the number of users is.
+    """
+    users_reports = context.setdefault('users_course_reports', {})
+    course_titles = context.setdefault('course_titles', {})
+    course_badges = context.setdefault('course_badges', {})
+    course_ids = set()
+    for user_id in user_ids:
+        users_reports[user_id] = []
+    for report in LearnerCourseJsonReport.objects.filter(user_id__in=user_ids):
+        users_reports[report.user_id].append(report)
+        course_badges[(report.user_id, unicode(report.course_id))] = []
+        course_ids.add(report.course_id)
+    if not course_ids:
+        return
+
+    course_titles.update(
+        (unicode(course_id), display_name)
+        for course_id, display_name in CourseOverview.objects.filter(
+            id__in=course_ids
+        ).values_list('id', 'display_name')
+    )
+    badges = LearnerBadgeJsonReport.objects.filter(
+        user_id__in=user_ids, badge__course_id__in=course_ids
+    ).select_related('badge')
+    for badge in badges:
+        course_badges.setdefault((badge.user_id, unicode(badge.badge.course_id)), []).append(badge)
 
 
 class LearnerBadgeJsonReportSerializer(serializers.ModelSerializer):
@@ -379,14 +620,33 @@ class LearnerCourseJsonReportSerializer(serializers.ModelSerializer):
             return None
 
     def get_course_title(self, obj):
+        course_titles = self.context.get('course_titles')
+        if course_titles is not None:
+            return course_titles.get(unicode(obj.course_id)) or obj.course_id
         course_overview = CourseOverview.objects.filter(id=obj.course_id).first()
         return course_overview and course_overview.display_name or obj.course_id
 
     def get_badges(self, obj):
-        badges = LearnerBadgeJsonReport.objects.filter(user_id=obj.user_id, badge__course_id=obj.course_id)
+        course_badges = self.context.get('course_badges')
+        if course_badges is not None:
+            badges = course_badges.get((obj.user_id, unicode(obj.course_id)), [])
+        else:
+            badges = LearnerBadgeJsonReport.objects.filter(user_id=obj.user_id, badge__course_id=obj.course_id)
         return LearnerBadgeJsonReportSerializer(badges, many=True).data
 
 
+class UserProgressListSerializer(serializers.ListSerializer):
+    """
+    Loads progress reports of all listed users at once, so the nested courses don't query per user.
+    """
+
+    def to_representation(self, data):
+        users = list(data.all() if isinstance(data, models.Manager) else data)
+        if 'courses' in self.child.fields:
+            load_users_progress([user.id for user in users], self.context)
+        return [self.child.to_representation(user) for user in users]
+
+
 class UserProgressSerializer(RetrieveListUserSerializer):
     name = serializers.CharField(source='profile.name')
     courses = serializers.SerializerMethodField()
@@ -394,7 +654,44 @@ class UserProgressSerializer(RetrieveListUserSerializer):
     class Meta(object):
         model = User
         fields = ('user_id', 'username', 'name', 'courses')
+        list_serializer_class = UserProgressListSerializer
 
     def get_courses(self, user):
-        courses = LearnerCourseJsonReportSerializer.Meta.model.objects.filter(user=user)
-        return LearnerCourseJsonReportSerializer(courses, many=True).data
+        users_reports = self.context.setdefault('users_course_reports', {})
+        if user.id not in users_reports:
+            load_users_progress([user.id], self.context)
+        return LearnerCourseJsonReportSerializer(users_reports[user.id], many=True, context=self.context).data
+
+
+class DeactivationJobSerializer(serializers.ModelSerializer):
+    job_id = serializers.IntegerField(source='id', read_only=True)
+
+    class Meta(object):
+        model = DeactivationJob
+        fields = ('job_id', 'status', 'total', 'processed', 'error', 'created', 'modified')
+
+
+class DeactivationJobResultSerializer(serializers.ModelSerializer):
+
+    class Meta(object):
+        model = DeactivationJobResult
+        fields = ('user_id', 'username', 'status')
+
+
+class ProgressReportJobSerializer(serializers.ModelSerializer):
+    job_id = serializers.IntegerField(source='id', read_only=True)
+    download_url = serializers.SerializerMethodField()
+
+    class Meta(object):
+        model = ProgressReportJob
+        fields = (
+            'job_id', 'status', 'export_format', 'scheduled', 'total', 'processed', 'error', 'created', 'modified',
+            'download_url'
+        )
+
+    def get_download_url(self, job):
+        if job.status != ProgressReportJob.SUCCEEDED:
+            return None
+        url = reverse('edx_extended_api:progress_report_jobs-download', kwargs={'pk': job.id})
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import logging
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from openedx.core.djangoapps.site_configuration.models import SiteConfiguration
+from student.models import UserProfile
+from xmodule.modulestore.django import SignalHandler
+
+from .course_metadata import delete_course_metadata, refresh_course_metadata
+from .hierarchy import get_direct_supervisor, rebuild_user_hierarchy
+from .models import UserModification
+from .search import index_users
+from .utils import clear_groups_ids_cache, clear_site_orgs_cache
+
+
+log = logging.getLogger(__name__)
+User = get_user_model()
+
+
+@receiver(post_save, sender=SiteConfiguration)
+def site_configuration_saved(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    clear_site_orgs_cache(instance.site_id)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, **kwargs):  # pylint: disable=unused-argument
+    clear_groups_ids_cache()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, update_fields=None, **kwargs):  # pylint: disable=unused-argument
+    # Logins only update `last_login`, which is not returned by the API.
+    if update_fields is None or set(update_fields) - {'last_login'}:
+        UserModification.touch([instance.pk])
+        index_users([instance.pk])
+
+
+@receiver(post_save, sender=UserProfile)
+def user_profile_saved(sender, instance, created, **kwargs):  # pylint: disable=unused-argument
+    UserModification.touch([instance.user_id])
+    index_users([instance.user_id])
+    # A new user may already be the supervisor of existing users.
+    if created or get_direct_supervisor(instance.user_id) != (instance.lt_supervisor or None):
+        rebuild_user_hierarchy([instance.user_id])
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):  # pylint: disable=unused-argument
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        UserModification.touch([instance.pk])
+    elif pk_set:
+        UserModification.touch(pk_set)
+
+
+@receiver(SignalHandler.course_published)
+def course_published(sender, course_key, **kwargs):  # pylint: disable=unused-argument
+    # Publishing must not fail because of the API, a missed refresh is fixed by `refresh_course_metadata` command.
+    try:
+        refresh_course_metadata(course_key)
+    except Exception:  # pylint: disable=broad-except
+        log.exception('Unable to refresh the metadata of course %s', course_key)
+
+
+@receiver(SignalHandler.course_deleted)
+def course_deleted(sender, course_key, **kwargs):  # pylint: disable=unused-argument
+    delete_course_metadata(course_key)
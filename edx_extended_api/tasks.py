@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import json
+import logging
+import tempfile
+
+from celery import task
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+
+from .models import DEACTIVATE_STATUSES, DeactivationJob, DeactivationJobResult, ProgressReportJob, UserModification
+from .serializers import UserProgressSerializer
+from .utils import get_reports_storage, iter_csv, iter_ndjson
+
+
+log = logging.getLogger(__name__)
+User = get_user_model()
+
+DEACTIVATION_CHUNK_SIZE = getattr(settings, 'EDX_EXTENDED_API_DEACTIVATION_CHUNK_SIZE', 500)
+PROGRESS_REPORT_CHUNK_SIZE = getattr(settings, 'EDX_EXTENDED_API_PROGRESS_REPORT_CHUNK_SIZE', 1000)
+PROGRESS_REPORT_CSV_FIELDS = (
+    'user_id', 'username', 'name', 'course_id', 'course_title', 'status', 'progress', 'current_score',
+    'total_time_spent', 'enrollment_date', 'completion_date', 'badges'
+)
+
+
+@task()
+def deactivate_users(job_id):
+    """
+    Deactivates users of the job by chunks, each chunk in its own short transaction.
+    """
+    job = DeactivationJob.objects.get(id=job_id)
+    job.set_status(DeactivationJob.RUNNING)
+    users = job.get_users()
+    queryset = User.objects.filter(profile__org__in=job.get_orgs())
+    try:
+        for start in range(job.processed, len(users), DEACTIVATION_CHUNK_SIZE):
+            chunk = users[start:start + DEACTIVATION_CHUNK_SIZE]
+            with transaction.atomic():
+                found = {
+                    user[job.lookup_field]: user
+                    for user in queryset.filter(
+                        **{job.lookup_field + '__in': chunk}
+                    ).values('id', 'username', 'is_active')
+                }
+                deactivated_ids = [user['id'] for user in found.values() if user['is_active']]
+                User.objects.filter(id__in=deactivated_ids).update(is_active=False)
+                UserModification.touch(deactivated_ids)
+                results = []
+                for value in chunk:
+                    user = found.get(value, {
+                        'id': value if job.lookup_field == 'id' else None,
+                        'username': value if job.lookup_field == 'username' else '',
+                        'is_active': None,
+                    })
+                    results.append(DeactivationJobResult(
+                        job=job,
+                        user_id=user['id'],
+                        username=user['username'],
+                        status=DEACTIVATE_STATUSES[user['is_active']]
+                    ))
+                DeactivationJobResult.objects.bulk_create(results)
+                DeactivationJob.objects.filter(id=job.id).update(processed=F('processed') + len(chunk))
+    except Exception as exc:
+        log.exception('Deactivation job %s failed.', job.id)
+        job.set_status(DeactivationJob.FAILED, unicode(exc))
+        raise
+    job.set_status(DeactivationJob.SUCCEEDED)
+
+
+def iter_progress_rows(job, queryset):
+    """
+    Yields serialized progress of the users, reading them by chunks ordered by id and counting them as processed.
+    """
+    last_id = 0
+    while True:
+        users = list(queryset.filter(id__gt=last_id).order_by('id')[:PROGRESS_REPORT_CHUNK_SIZE])
+        if not users:
+            return
+        for row in UserProgressSerializer(users, many=True).data:
+            yield row
+        ProgressReportJob.objects.filter(id=job.id).update(processed=F('processed') + len(users))
+        last_id = users[-1].id
+
+
+def iter_progress_csv_rows(rows):
+    """
+    Yields one row per user and course, badges being JSON encoded, and one row for users without courses.
+    """
+    for row in rows:
+        user = {'user_id': row['user_id'], 'username': row['username'], 'name': row['name']}
+        if not row['courses']:
+            yield user
+        for course in row['courses']:
+            yield dict(user, badges=json.dumps(course.pop('badges')), **course)
+
+
+@task()
+def generate_progress_report(job_id):
+    """
+    Writes progress of all the users of the job organizations to a report file.
+    """
+    job = ProgressReportJob.objects.get(id=job_id)
+    job.set_status(ProgressReportJob.RUNNING)
+    queryset = User.objects.filter(profile__org__in=job.get_orgs()).select_related('profile')
+    try:
+        job.total = queryset.count()
+        job.processed = 0
+        job.save(update_fields=['total', 'processed', 'modified'])
+
+        rows = iter_progress_rows(job, queryset)
+        if job.export_format == ProgressReportJob.CSV:
+            content = iter_csv(iter_progress_csv_rows(rows), PROGRESS_REPORT_CSV_FIELDS)
+        else:
+            content = iter_ndjson(rows)
+        with tempfile.TemporaryFile() as report_file:
+            for chunk in content:
+                report_file.write(force_bytes(chunk))
+            report_file.seek(0)
+            job.file_name = get_reports_storage().save('progress_report_{}_{}.{}'.format(
+                job.id, timezone.now().strftime('%Y%m%d%H%M%S'), job.export_format
+            ), File(report_file))
+        job.save(update_fields=['file_name', 'modified'])
+    except Exception as exc:
+        log.exception('Progress report job %s failed.', job.id)
+        job.set_status(ProgressReportJob.FAILED, unicode(exc))
+        raise
+    job.set_status(ProgressReportJob.SUCCEEDED)
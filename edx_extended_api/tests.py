@@ -1,19 +1,42 @@
+import datetime
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import mock
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
 
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
 from django.contrib.sites.models import Site
-from triboo_analytics.models import LearnerCourseJsonReport
+from django.core.management import call_command
+from triboo_analytics.models import LearnerCourseJsonReport, ANALYTICS_ACCESS_GROUP, ANALYTICS_LIMITED_ACCESS_GROUP
 from student.models import UserProfile, CourseEnrollment
 from lms.djangoapps.course_api.tests.mixins import CourseApiFactoryMixin
 from openedx.core.djangoapps.site_configuration.models import SiteConfiguration
 from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
+from openedx.core.djangoapps.models.course_details import CourseDetails
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.tests.factories import CourseFactory, XMODULE_FACTORY_LOCK
+from student import triboo_groups
 from student.roles import STUDIO_ADMIN_ACCESS_GROUP
 
+from .course_metadata import refresh_course_metadata
+from .metrics import Registry, registry
+from .models import CourseMetadata, CourseMetadataValue, ProgressReportJob, UserHierarchy, UserModification
+from .serializers import RetrieveListUserSerializer
+from .utils import get_groups_ids
+
 
 User = get_user_model()
 test_config_multi_org = {   # pylint: disable=invalid-name
@@ -21,6 +44,13 @@ test_config_multi_org = {   # pylint: disable=invalid-name
 }
 
 
+def run_on_commit():
+    """
+    Runs `transaction.on_commit` callbacks at once, test cases are never committed.
+    """
+    return mock.patch('django.db.transaction.on_commit', side_effect=lambda func: func())
+
+
 def create_mock_site_config():
     site, __ = Site.objects.get_or_create(domain="example.com", name="example.com")
     site_configuration, created = SiteConfiguration.objects.get_or_create(
@@ -143,6 +173,94 @@ class CreateUserTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
         self.assertEqual(response.data.get('status'), 'email_already_used')
 
+    def test_bulk_user_creation(self):
+        url = reverse('edx_extended_api:users-list')
+        data = [
+            {
+                "username": "user1",
+                "email": "user1@example.com",
+                "first_name": "first1",
+                "last_name": "last1",
+                "name": "One",
+                "platform_role": "Studio Admin",
+                "edflex_catalog_access": True
+            },
+            {
+                "username": "user2",
+                "email": "user2@example.com",
+                "first_name": "first2",
+                "last_name": "last2",
+                "name": "Two",
+                "platform_role": "Platform Admin"
+            },
+            {
+                "username": "edx",
+                "email": "user3@example.com",
+                "first_name": "first3",
+                "last_name": "last3",
+                "name": "Three"
+            },
+            {
+                "username": "user4",
+                "email": "user1@example.com",
+                "first_name": "first4",
+                "last_name": "last4",
+                "name": "Four"
+            },
+            {
+                "username": "user5",
+                "email": "user5@example.com"
+            }
+        ]
+
+        response = self.client.post(url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['status'] for item in response.data],
+            ['user_created', 'user_created', 'username_already_used', 'email_already_used', 'invalid_data']
+        )
+        self.assertIn('first_name', response.data[4]['errors'])
+        user1 = User.objects.get(username='user1')
+        user2 = User.objects.get(username='user2')
+        self.assertEqual(response.data[0]['user_id'], user1.id)
+        self.assertEqual(response.data[1]['user_id'], user2.id)
+        self.assertEqual(user1.profile.name, 'One')
+        self.assertEqual(user1.profile.org, self.user.profile.org)
+        self.assertEqual(
+            set(user1.groups.values_list('name', flat=True)),
+            {STUDIO_ADMIN_ACCESS_GROUP, triboo_groups.EDFLEX_DENIED_GROUP}
+        )
+        self.assertTrue(user2.is_staff)
+        self.assertFalse(user2.is_superuser)
+        self.assertFalse(User.objects.filter(username__in=['user4', 'user5']).exists())
+
+    def test_bulk_user_creation_normalized_identities(self):
+        url = reverse('edx_extended_api:users-list')
+        identities = [
+            (" user6 ", "user6@example.com"),
+            ("EDX", "user7@example.com"),
+            ("user8", "EDX@example.com"),
+            ("User6", "user9@example.com"),
+            ("user10", " USER6@example.com"),
+        ]
+        data = [
+            {"username": username, "email": email, "first_name": "first", "last_name": "last", "name": "Name"}
+            for username, email in identities
+        ]
+
+        response = self.client.post(url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['status'] for item in response.data],
+            ['user_created', 'username_already_used', 'email_already_used', 'username_already_used',
+             'email_already_used']
+        )
+        self.assertEqual(response.data[0]['username'], 'user6')
+        self.assertEqual(response.data[0]['user_id'], User.objects.get(username='user6').id)
+        self.assertFalse(User.objects.filter(username__in=['EDX', 'user8', 'User6', 'user10']).exists())
+
 
 class UpdateUserTests(APITestCase):
 
@@ -187,6 +305,44 @@ class UpdateUserTests(APITestCase):
         self.assertEqual(response.data.get('status'), 'user_updated')
         self.assertEqual(response.data.get('name'), 'New_one_by_id')
 
+    def test_accesses_update_by_id(self):
+        url = reverse(
+            'edx_extended_api:users-detail',
+            kwargs={'pk': self.user1.id}
+        )
+
+        response = self.client.put(url, {
+            "analytics_access": "Full Access",
+            "platform_role": "Studio Admin",
+            "edflex_catalog_access": True
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data.get('platform_role'), 'Studio Admin')
+        self.assertEqual(
+            set(self.user1.groups.values_list('name', flat=True)),
+            {ANALYTICS_ACCESS_GROUP, STUDIO_ADMIN_ACCESS_GROUP, triboo_groups.EDFLEX_DENIED_GROUP}
+        )
+
+        response = self.client.put(url, {
+            "analytics_access": "Restricted",
+            "platform_role": "Learner",
+            "edflex_catalog_access": False
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data.get('analytics_access'), 'Restricted')
+        self.assertEqual(set(self.user1.groups.values_list('name', flat=True)), {ANALYTICS_LIMITED_ACCESS_GROUP})
+
+    def test_groups_ids_cache_expires(self):
+        group = Group.objects.get_or_create(name=ANALYTICS_ACCESS_GROUP)[0]
+        stale_cache = {ANALYTICS_ACCESS_GROUP: (group.id + 1000, time.time() - 1)}
+
+        with mock.patch.dict('edx_extended_api.utils._groups_ids_cache', stale_cache, clear=True):
+            groups_ids = get_groups_ids([ANALYTICS_ACCESS_GROUP])
+
+        self.assertEqual(groups_ids, {ANALYTICS_ACCESS_GROUP: group.id})
+
     def test_user_not_found_update_by_id(self):
         url = reverse(
             'edx_extended_api:users-detail',
@@ -245,6 +401,24 @@ class UpdateUserTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
         self.assertEqual(response.data.get('status'), 'email_already_used')
 
+    def test_username_and_email_used_update_by_id(self):
+        user2 = User.objects.create(username='user2', email='user2@example.com')
+        UserProfile.objects.create(user=user2, org="FooOrg")
+        url = reverse(
+            'edx_extended_api:users-detail',
+            kwargs={'pk': self.user1.id}
+        )
+        data = {
+            "username": "edx",
+            "email": "user2@example.com"
+        }
+
+        response = self.client.put(url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data.get('status'), 'username_already_used')
+        self.assertEqual(response.data.get('conflicts'), ['username_already_used', 'email_already_used'])
+
     def test_successful_user_update_by_username(self):
         url = reverse(
             'edx_extended_api:users_by_username-detail',
@@ -318,6 +492,102 @@ class UpdateUserTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
         self.assertEqual(response.data.get('status'), 'email_already_used')
 
+    def test_bulk_user_update_by_id(self):
+        user2 = User.objects.create(username='user2', email='user2@example.com')
+        UserProfile.objects.create(user=user2, name='Two', org="FooOrg")
+        url = reverse('edx_extended_api:users-list')
+        data = [
+            {"user_id": self.user1.id, "name": "New_one", "lt_department": "Sales", "platform_role": "Studio Admin"},
+            {"user_id": user2.id, "email": "user1@example.com"},
+            {"user_id": 100, "name": "Nobody"},
+        ]
+
+        response = self.client.patch(url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['status'] for item in response.data],
+            ['user_updated', 'email_already_used', 'user_not_found']
+        )
+        self.user1_profile.refresh_from_db()
+        self.assertEqual(self.user1_profile.name, 'New_one')
+        self.assertEqual(self.user1_profile.lt_department, 'Sales')
+        self.assertTrue(self.user1.groups.filter(name=STUDIO_ADMIN_ACCESS_GROUP).exists())
+        self.assertEqual(User.objects.get(id=user2.id).email, 'user2@example.com')
+
+    def test_bulk_user_update_by_username(self):
+        self.user1.is_active = False
+        self.user1.save()
+        url = reverse('edx_extended_api:users_by_username-list')
+        data = [
+            {"username": "edx", "first_name": "New_first"},
+            {"username": self.user1.username, "first_name": "Inactive"},
+        ]
+
+        response = self.client.patch(url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['status'] for item in response.data], ['user_updated', 'user_inactive'])
+        self.assertEqual(User.objects.get(username='edx').first_name, 'New_first')
+        self.assertEqual(User.objects.get(username=self.user1.username).first_name, 'first1')
+
+    def test_bulk_user_update_conflicts_within_batch(self):
+        user2 = User.objects.create(username='user2', email='user2@example.com')
+        UserProfile.objects.create(user=user2, name='Two', org="FooOrg")
+        url = reverse('edx_extended_api:users-list')
+        data = [
+            {"user_id": self.user1.id, "username": "renamed", "email": "new@example.com"},
+            {"user_id": user2.id, "username": "renamed"},
+            {"user_id": user2.id, "email": "new@example.com"},
+        ]
+
+        response = self.client.patch(url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['status'] for item in response.data],
+            ['user_updated', 'username_already_used', 'email_already_used']
+        )
+        self.assertEqual(User.objects.get(id=self.user1.id).username, 'renamed')
+        self.assertEqual(User.objects.get(id=user2.id).username, 'user2')
+
+    def test_bulk_user_update_normalized_identities(self):
+        user2 = User.objects.create(username='user2', email='user2@example.com')
+        UserProfile.objects.create(user=user2, name='Two', org="FooOrg")
+        url = reverse('edx_extended_api:users-list')
+        data = [
+            {"user_id": self.user1.id, "username": "EDX"},
+            {"user_id": self.user1.id, "email": " USER2@example.com"},
+            {"user_id": self.user1.id, "username": " Renamed "},
+            {"user_id": user2.id, "username": "RENAMED"},
+        ]
+
+        response = self.client.patch(url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['status'] for item in response.data],
+            ['username_already_used', 'email_already_used', 'user_updated', 'username_already_used']
+        )
+        self.assertEqual(response.data[2]['username'], 'Renamed')
+        self.assertEqual(User.objects.get(id=self.user1.id).username, 'Renamed')
+        self.assertEqual(User.objects.get(id=user2.id).username, 'user2')
+
+    def test_bulk_user_update_same_user_group_changes(self):
+        url = reverse('edx_extended_api:users-list')
+        data = [
+            {"user_id": self.user1.id, "platform_role": "Studio Admin", "analytics_access": "Restricted"},
+            {"user_id": self.user1.id, "analytics_access": "Full Access"},
+        ]
+
+        response = self.client.patch(url, data, format='json')
+
+        self.assertEqual([item['status'] for item in response.data], ['user_updated', 'user_updated'])
+        groups = set(self.user1.groups.values_list('name', flat=True))
+        self.assertIn(STUDIO_ADMIN_ACCESS_GROUP, groups)
+        self.assertIn(ANALYTICS_ACCESS_GROUP, groups)
+        self.assertNotIn(ANALYTICS_LIMITED_ACCESS_GROUP, groups)
+
 
 class GetUserTests(APITestCase):
 
@@ -366,6 +636,31 @@ class GetUserTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data.get("results")), 3)
 
+    def test_get_users_resolves_site_orgs_once(self):
+        url = reverse('edx_extended_api:users-list')
+
+        with mock.patch.dict('edx_extended_api.utils._site_orgs_cache', clear=True), mock.patch(
+            'edx_extended_api.utils.configuration_helpers.get_current_site_orgs', return_value=["FooOrg"]
+        ) as get_current_site_orgs:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(get_current_site_orgs.call_count, 1)
+
+    def test_get_users_site_orgs_change(self):
+        url = reverse('edx_extended_api:users-list')
+        self.client.get(url)
+        self.user1_profile.org = "OtherOrg"
+        self.user1_profile.save()
+        site_configuration = SiteConfiguration.objects.get(site__domain="example.com")
+        site_configuration.values = {"course_org_filter": ["FooOrg", "OtherOrg"]}
+        site_configuration.save()
+
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data.get("results")), 3)
+
     def test_get_users_org_filtering(self):
         self.user2_profile.org = ""
         self.user2_profile.save()
@@ -414,6 +709,28 @@ class GetUserTests(APITestCase):
         self.assertEqual(response1.data.get("platform_role"), "Platform Admin")
         self.assertEqual(response2.data.get("platform_role"), "Studio Admin")
 
+    def test_get_users_accesses(self):
+        studio_admin_group, _ = Group.objects.get_or_create(name=STUDIO_ADMIN_ACCESS_GROUP)
+        analytics_group, _ = Group.objects.get_or_create(name=ANALYTICS_LIMITED_ACCESS_GROUP)
+        edflex_denied_group, _ = Group.objects.get_or_create(name=triboo_groups.EDFLEX_DENIED_GROUP)
+        self.user1.groups.add(studio_admin_group, analytics_group)
+        self.user2.groups.add(edflex_denied_group)
+        url = "{}?{}".format(
+            reverse('edx_extended_api:users-list'),
+            "user_id={},{}".format(self.user1.id, self.user2.id)
+        )
+
+        response = self.client.get(url)
+
+        results = response.data.get("results")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(results[0].get("platform_role"), "Studio Admin")
+        self.assertEqual(results[0].get("analytics_access"), "Restricted")
+        self.assertFalse(results[0].get("edflex_catalog_access"))
+        self.assertEqual(results[1].get("platform_role"), "Learner")
+        self.assertIsNone(results[1].get("analytics_access"))
+        self.assertTrue(results[1].get("edflex_catalog_access"))
+
     def test_get_users_by_ids(self):
         url = "{}?{}".format(
             reverse('edx_extended_api:users-list'),
@@ -427,6 +744,171 @@ class GetUserTests(APITestCase):
         self.assertEqual(response.data.get("results")[0].get("user_id"), self.user1.id)
         self.assertEqual(response.data.get("results")[1].get("user_id"), self.user2.id)
 
+    def test_get_users_sparse_fieldset(self):
+        url = "{}?{}".format(
+            reverse('edx_extended_api:users-list'),
+            "fields=user_id,username,email,is_active"
+        )
+
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for result in response.data.get("results"):
+            self.assertEqual(set(result.keys()), {"user_id", "username", "email", "is_active"})
+
+    def test_get_user_excluded_fields(self):
+        url = "{}?{}".format(
+            reverse('edx_extended_api:users-detail', kwargs={'pk': self.user1.id}),
+            "exclude=platform_role,analytics_access"
+        )
+
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data.get("username"), "user1")
+        self.assertNotIn("platform_role", response.data)
+        self.assertNotIn("analytics_access", response.data)
+
+    def test_get_users_cursor_pagination(self):
+        url = "{}?{}".format(
+            reverse('edx_extended_api:users-list'),
+            "pagination=cursor&page_size=2"
+        )
+
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("count", response.data)
+        self.assertEqual(
+            [result["user_id"] for result in response.data.get("results")],
+            [self.user.id, self.user1.id]
+        )
+
+        response = self.client.get(response.data.get("next"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result["user_id"] for result in response.data.get("results")], [self.user2.id])
+        self.assertIsNone(response.data.get("next"))
+
+    def test_get_users_values_same_as_instances(self):
+        Group.objects.get_or_create(name=ANALYTICS_ACCESS_GROUP)[0].user_set.add(self.user1)
+        self.user2_profile.lt_hire_date = datetime.date(2020, 1, 31)
+        self.user2_profile.lt_gdpr = True
+        self.user2_profile.save()
+        users = User.objects.order_by('id')
+        serializer = RetrieveListUserSerializer()
+
+        rows = serializer.values_to_representation(users.values(*serializer.get_columns()))
+
+        self.assertEqual(json.dumps(rows), json.dumps(RetrieveListUserSerializer(users, many=True).data))
+
+    def test_get_users_compact(self):
+        url = "{}?compact=true".format(reverse('edx_extended_api:users-list'))
+
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        result = next(result for result in response.data.get("results") if result["username"] == "user1")
+        self.assertNotIn("lt_hire_date", result)
+        self.assertNotIn("analytics_access", result)
+        self.assertNotIn(None, result.values())
+
+    @mock.patch('edx_extended_api.renderers.COMPRESSION_MIN_SIZE', 0)
+    def test_get_users_gzip(self):
+        url = reverse('edx_extended_api:users-list')
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertTrue(response['ETag'].startswith('W/'))
+        content = gzip.GzipFile(fileobj=io.BytesIO(response.content)).read()
+        self.assertEqual(len(json.loads(content.decode('utf-8')).get("results")), 3)
+
+    def test_get_users_modified_since(self):
+        two_days_ago = timezone.now() - datetime.timedelta(days=2)
+        User.objects.update(date_joined=two_days_ago)
+        UserModification.objects.update(modified=two_days_ago)
+        self.user1_profile.name = 'Changed'
+        self.user1_profile.save()
+        url = "{}?modified_since={}".format(
+            reverse('edx_extended_api:users-list'),
+            (timezone.now() - datetime.timedelta(days=1)).date().isoformat()
+        )
+
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result["user_id"] for result in response.data.get("results")], [self.user1.id])
+
+    def test_get_users_modified_since_invalid(self):
+        url = "{}?modified_since=yesterday".format(reverse('edx_extended_api:users-list'))
+
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("modified_since", response.data)
+
+    def test_get_users_not_modified(self):
+        url = reverse('edx_extended_api:users-list')
+
+        response = self.client.get(url)
+        etag = response['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+        self.user1.first_name = "Changed"
+        self.user1.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_get_user_not_modified(self):
+        url = reverse('edx_extended_api:users-detail', kwargs={'pk': self.user1.id})
+
+        response = self.client.get(url)
+        last_modified = response['Last-Modified']
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(
+            reverse('edx_extended_api:users-detail', kwargs={'pk': self.user2.id}), HTTP_IF_NONE_MATCH=response['ETag']
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_export_users_ndjson(self):
+        url = reverse('edx_extended_api:users-export')
+
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row["username"] for row in rows], ["edx", "user1", "user2"])
+
+    def test_export_users_csv(self):
+        url = "{}?{}".format(
+            reverse('edx_extended_api:users-export'),
+            "export_format=csv&fields=user_id,username"
+        )
+
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(lines[0], b'username,user_id')
+        self.assertEqual(lines[1:], [
+            'edx,{}'.format(self.user.id).encode('utf-8'),
+            'user1,{}'.format(self.user1.id).encode('utf-8'),
+            'user2,{}'.format(self.user2.id).encode('utf-8'),
+        ])
+
     def test_get_user_by_id_not_found(self):
         url = reverse(
             'edx_extended_api:users-detail',
@@ -473,6 +955,49 @@ class GetUserTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertEqual(response.data.get("detail"), "Not found.")
 
+    def test_search_users(self):
+        self.user1_profile.name = 'John Smith'
+        self.user1_profile.lt_employee_id = 'E42'
+        self.user1_profile.save()
+        other = User.objects.create(username='smith', email='smith@example.com')
+        UserProfile.objects.create(user=other, name='Smith', org="OtherOrg")
+        url = reverse('edx_extended_api:users-search')
+
+        response = self.client.get(url, {'q': 'SMI'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result["username"] for result in response.data.get("results")], [self.user1.username])
+
+        response = self.client.get(url, {'q': 'e42'})
+
+        self.assertEqual([result["username"] for result in response.data.get("results")], [self.user1.username])
+
+    def test_search_users_ranking(self):
+        self.user2_profile.name = 'user1'
+        self.user2_profile.save()
+        url = reverse('edx_extended_api:users-search')
+
+        response = self.client.get(url, {'q': 'user1', 'fields': 'username'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data.get("results"), [{"username": "user1"}, {"username": "user2"}])
+
+        self.user2.username = 'user10'
+        self.user2.save()
+        self.user2_profile.name = 'Two'
+        self.user2_profile.save()
+
+        response = self.client.get(url, {'q': 'user1', 'fields': 'username'})
+
+        self.assertEqual(response.data.get("results"), [{"username": "user1"}, {"username": "user10"}])
+
+    def test_search_users_query_too_short(self):
+        url = reverse('edx_extended_api:users-search')
+
+        response = self.client.get(url, {'q': 'u'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
 
 class DeactivateUserTests(APITestCase):
 
@@ -543,6 +1068,72 @@ class DeactivateUserTests(APITestCase):
         self.assertEqual(response.data[1].get("status"), "user_deactivated")
         self.assertEqual(response.data[1].get("user_id"), self.user2.id)
 
+    def test_deactivate_users_metrics(self):
+        registry.clear()
+        url = "{}?{}".format(
+            reverse('edx_extended_api:users-list'),
+            "user_id={},{}".format(self.user1.id, 999999)
+        )
+        self.client.delete(url)
+
+        response = self.client.get(reverse('edx_extended_api:metrics'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('text/plain', response['Content-Type'])
+        lines = response.content.decode('utf-8').splitlines()
+        self.assertIn('# TYPE edx_extended_api_requests_total counter', lines)
+        self.assertTrue(any(
+            line.startswith('edx_extended_api_item_statuses_total{action="bulk_destroy",status="user_not_found",')
+            and line.endswith(' 1') for line in lines
+        ))
+        self.assertTrue(any(
+            line.startswith('edx_extended_api_bulk_batch_size_count{action="bulk_destroy",') and line.endswith(' 1')
+            for line in lines
+        ))
+
+    def test_bulk_response_metrics_totals(self):
+        registry.clear()
+        url = "{}?{}".format(
+            reverse('edx_extended_api:users-list'),
+            "user_id={},{},{}".format(self.user1.id, 999998, 999999)
+        )
+
+        with mock.patch.object(registry, 'inc', wraps=registry.inc) as inc:
+            self.client.delete(url)
+
+        status_calls = [call for call in inc.call_args_list if call[0][0] == 'edx_extended_api_item_statuses_total']
+        self.assertEqual(len(status_calls), 2)
+        lines = registry.render().splitlines()
+        prefix = 'edx_extended_api_item_statuses_total{action="bulk_destroy",status='
+        self.assertIn(prefix + '"user_not_found",viewset="UsersViewSet"} 2', lines)
+        self.assertIn(prefix + '"user_deactivated",viewset="UsersViewSet"} 1', lines)
+
+    def test_metrics_shared_by_registries(self):
+        registry.clear()
+        labels = {'viewset': 'UsersViewSet', 'action': 'list'}
+        registry.observe('edx_extended_api_request_duration_seconds', labels, 0.02)
+        Registry().observe('edx_extended_api_request_duration_seconds', labels, 0.2)
+
+        lines = Registry().render().splitlines()
+
+        prefix = 'edx_extended_api_request_duration_seconds'
+        self.assertIn(prefix + '_bucket{action="list",viewset="UsersViewSet",le="0.025"} 1', lines)
+        self.assertIn(prefix + '_bucket{action="list",viewset="UsersViewSet",le="+Inf"} 2', lines)
+        self.assertIn(prefix + '_sum{action="list",viewset="UsersViewSet"} 0.22', lines)
+        self.assertIn(prefix + '_count{action="list",viewset="UsersViewSet"} 2', lines)
+
+    @override_settings(EDX_EXTENDED_API_METRICS_TOKEN='secret')
+    def test_metrics_with_token(self):
+        self.client.force_authenticate(user=None)
+
+        response = self.client.get(reverse('edx_extended_api:metrics'))
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        response = self.client.get(reverse('edx_extended_api:metrics'), HTTP_X_METRICS_TOKEN='secret')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
     def test_deactivate_user_by_id_already_deactivated(self):
         self.user1.is_active = False
         self.user1.save()
@@ -625,6 +1216,50 @@ class DeactivateUserTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertEqual(response.data.get("detail"), "Not found.")
 
+    def test_deactivation_job_by_ids(self):
+        self.user2.is_active = False
+        self.user2.save()
+        url = reverse('edx_extended_api:deactivation_jobs-list')
+        data = {"user_id": [self.user1.id, self.user2.id, 123]}
+
+        with run_on_commit():
+            response = self.client.post(url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data.get("total"), 3)
+        job_url = reverse('edx_extended_api:deactivation_jobs-detail', kwargs={'pk': response.data.get("job_id")})
+        response = self.client.get(job_url)
+        self.assertEqual(response.data.get("status"), "succeeded")
+        self.assertEqual(response.data.get("processed"), 3)
+
+        response = self.client.get(
+            reverse('edx_extended_api:deactivation_jobs-result', kwargs={'pk': response.data.get("job_id")})
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(result["user_id"], result["status"]) for result in response.data.get("results")],
+            [(self.user1.id, "user_deactivated"), (self.user2.id, "user_already_inactive"), (123, "user_not_found")]
+        )
+        self.assertFalse(User.objects.get(id=self.user1.id).is_active)
+
+    def test_deactivation_job_by_usernames(self):
+        url = reverse('edx_extended_api:deactivation_jobs-list')
+        data = {"username": [self.user1.username, self.user2.username]}
+
+        with run_on_commit():
+            response = self.client.post(url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertFalse(User.objects.filter(id__in=[self.user1.id, self.user2.id], is_active=True).exists())
+
+    def test_deactivation_job_without_users(self):
+        url = reverse('edx_extended_api:deactivation_jobs-list')
+
+        response = self.client.post(url, {"user_id": "1,2"}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
 
 class CoursesTests(CourseApiFactoryMixin, APITestCase):
 
@@ -662,6 +1297,140 @@ class CoursesTests(CourseApiFactoryMixin, APITestCase):
         self.assertEqual(len(response.data.get("results")), 1)
         self.assertEqual(len(response.data.get("results")[0].keys()), 15)
 
+    def test_get_courses_fetches_course_details_once(self):
+        cache.clear()
+        CourseMetadata.objects.all().delete()
+        test_course = CourseOverview.objects.first()
+        test_course.org = "FooOrg"
+        test_course.save()
+        url = reverse('edx_extended_api:courses-list')
+
+        with mock.patch('edx_extended_api.utils.CourseDetails.fetch', wraps=CourseDetails.fetch) as fetch:
+            self.client.get(url)
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(fetch.call_count, 1)
+
+    def test_get_courses_instrumented(self):
+        cache.clear()
+        CourseMetadata.objects.all().delete()
+        test_course = CourseOverview.objects.first()
+        test_course.org = "FooOrg"
+        test_course.save()
+        url = reverse('edx_extended_api:courses-list')
+
+        response = self.client.get(url)
+
+        self.assertNotIn('Server-Timing', response)
+
+        response = self.client.get(url, HTTP_X_INSTRUMENTATION='1')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(int(response['X-Query-Count']), 0)
+        self.assertIn('course_details;desc="1 calls"', response['Server-Timing'])
+        self.assertIn('serializer;desc="1 calls"', response['Server-Timing'])
+
+    def test_get_courses_instrumentation_requires_staff(self):
+        self.user.is_staff = False
+        self.user.save()
+        url = reverse('edx_extended_api:courses-list')
+
+        with mock.patch('edx_extended_api.instrumentation.Instrumentation') as instrumentation:
+            response = self.client.get(url, HTTP_X_INSTRUMENTATION='1')
+
+        self.assertNotIn('Server-Timing', response)
+        instrumentation.assert_not_called()
+
+    def test_get_courses_not_modified(self):
+        test_course = CourseOverview.objects.first()
+        test_course.org = "FooOrg"
+        test_course.save()
+        url = reverse('edx_extended_api:courses-list')
+
+        response = self.client.get(url)
+        etag = response['ETag']
+        with mock.patch('edx_extended_api.serializers.get_course_details') as get_course_details:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        get_course_details.assert_not_called()
+
+        test_course.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_get_courses_modified_since(self):
+        test_course = CourseOverview.objects.first()
+        test_course.org = "FooOrg"
+        test_course.save()
+        url = reverse('edx_extended_api:courses-list')
+        second = datetime.timedelta(seconds=1)
+
+        response = self.client.get(url, {'modified_since': (test_course.modified - second).isoformat()})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data.get("results")), 1)
+
+        response = self.client.get(url, {'modified_since': (test_course.modified + second).isoformat()})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data.get("results"), [])
+
+    def test_get_courses_stored_details(self):
+        cache.clear()
+        test_course = CourseOverview.objects.first()
+        test_course.org = "FooOrg"
+        test_course.save()
+        refresh_course_metadata(test_course.id)
+        url = reverse('edx_extended_api:courses-list')
+
+        with mock.patch('edx_extended_api.utils.CourseDetails.fetch') as fetch:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data.get("results")), 1)
+        fetch.assert_not_called()
+
+    def test_get_courses_urls_site_prefix(self):
+        test_course = CourseOverview.objects.first()
+        test_course.org = "FooOrg"
+        test_course.save()
+        details = refresh_course_metadata(test_course.id).get_details()
+        url = reverse('edx_extended_api:courses-list')
+
+        with mock.patch('edx_extended_api.utils.CourseDetails.fetch') as fetch, \
+                mock.patch('edx_extended_api.serializers.site_prefix', return_value='http://new.example.com'):
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        fetch.assert_not_called()
+        result = response.data.get("results")[0]
+        self.assertTrue(result["overview_url"].startswith('http://new.example.com/'))
+        self.assertEqual(result["card_image_url"], 'http://new.example.com' + details['course_image_asset_path'])
+        self.assertEqual(result["banner_image_url"], 'http://new.example.com' + details['banner_image_asset_path'])
+
+    def test_get_courses_filtered(self):
+        test_course = CourseOverview.objects.first()
+        test_course.org = "FooOrg"
+        test_course.save()
+        CourseMetadata.objects.filter(course_id=test_course.id).delete()
+        course_metadata = CourseMetadata.objects.create(course_id=test_course.id)
+        CourseMetadataValue.objects.create(course=course_metadata, field='tag', value='Sales')
+        CourseMetadataValue.objects.create(course=course_metadata, field='country', value='FR')
+        url = reverse('edx_extended_api:courses-list')
+
+        response = self.client.get(url, {'tag': 'Marketing,Sales', 'country': 'FR'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data.get("results")), 1)
+
+        response = self.client.get(url, {'tag': 'Sales', 'category': 'Management'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data.get("results"), [])
+
     def test_get_course_without_org(self):
         test_course = CourseOverview.objects.first()
         test_course.org = ""
@@ -766,6 +1535,128 @@ class UserProgressReportTests(CourseApiFactoryMixin, APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data.get("results")), 3)
 
+    def test_get_users_progress_reports_not_modified(self):
+        url = reverse('edx_extended_api:user_progress_report-list')
+
+        response = self.client.get(url)
+        etag = response['ETag']
+        with mock.patch('edx_extended_api.serializers.load_users_progress') as load_users_progress:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        load_users_progress.assert_not_called()
+
+        self.user2_profile.name = 'Changed'
+        self.user2_profile.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_get_users_progress_reports_courses(self):
+        test_course = CourseOverview.objects.first()
+        url = "{}?{}".format(
+            reverse('edx_extended_api:user_progress_report-list'),
+            "user_id={},{}".format(self.user1.id, self.user2.id)
+        )
+
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        courses = {result["username"]: result["courses"] for result in response.data.get("results")}
+        self.assertEqual(sorted(courses), [self.user1.username, self.user2.username])
+        for username in (self.user1.username, self.user2.username):
+            self.assertEqual(len(courses[username]), 1)
+            self.assertEqual(courses[username][0]["course_title"], test_course.display_name)
+            self.assertEqual(courses[username][0]["badges"], [])
+
+    def test_get_users_progress_reports_by_supervisor_tree(self):
+        self.user2_profile.lt_supervisor = self.user1.username
+        self.user2_profile.save()
+        self.user1_profile.lt_supervisor = self.user.username
+        self.user1_profile.save()
+        url = "{}?supervisor_tree={}".format(
+            reverse('edx_extended_api:user_progress_report-list'), self.user.username
+        )
+
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(result["username"] for result in response.data.get("results")),
+            [self.user1.username, self.user2.username]
+        )
+
+        self.user1_profile.lt_supervisor = ''
+        self.user1_profile.save()
+
+        response = self.client.get(url)
+
+        self.assertEqual(response.data.get("results"), [])
+
+    def test_user_hierarchy_cycle(self):
+        self.user2_profile.lt_supervisor = self.user1.username
+        self.user2_profile.save()
+        self.user1_profile.lt_supervisor = self.user.username
+        self.user1_profile.save()
+        profile = self.user.profile
+        profile.lt_supervisor = self.user2.username
+        profile.save()
+
+        self.assertEqual(
+            list(UserHierarchy.objects.filter(user=self.user).order_by('depth').values_list('supervisor', flat=True)),
+            [self.user2.username, self.user1.username]
+        )
+        self.assertEqual(
+            list(UserHierarchy.objects.filter(user=self.user1).order_by('depth').values_list('supervisor', flat=True)),
+            [self.user.username, self.user2.username]
+        )
+        self.assertEqual(
+            list(UserHierarchy.objects.filter(user=self.user2).order_by('depth').values_list('supervisor', flat=True)),
+            [self.user1.username, self.user.username]
+        )
+
+    def test_progress_report_job(self):
+        reports_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, reports_root)
+        url = reverse('edx_extended_api:progress_report_jobs-list')
+
+        with mock.patch('edx_extended_api.utils.REPORTS_ROOT', reports_root):
+            with run_on_commit():
+                response = self.client.post(url, {'export_format': 'ndjson'}, format='json')
+
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+            response = self.client.get(
+                reverse('edx_extended_api:progress_report_jobs-detail', kwargs={'pk': response.data['job_id']})
+            )
+
+            self.assertEqual(response.data['status'], 'succeeded')
+            self.assertEqual(response.data['total'], 3)
+            self.assertEqual(response.data['processed'], 3)
+
+            response = self.client.get(response.data['download_url'])
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+            self.assertEqual([row['username'] for row in rows], ['edx', 'user1', 'user2'])
+            self.assertEqual(len(rows[1]['courses']), 1)
+
+    def test_progress_report_command_csv(self):
+        reports_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, reports_root)
+
+        with mock.patch('edx_extended_api.utils.REPORTS_ROOT', reports_root):
+            call_command('generate_progress_reports', '--org', 'FooOrg', '--format', 'csv')
+
+        job = ProgressReportJob.objects.get()
+        self.assertTrue(job.scheduled)
+        self.assertEqual(job.status, ProgressReportJob.SUCCEEDED)
+        with open(os.path.join(reports_root, job.file_name), 'rb') as report_file:
+            lines = report_file.read().splitlines()
+        self.assertTrue(lines[0].startswith(b'user_id,username,name,course_id,'))
+        self.assertEqual(len(lines), 4)
+
     def test_get_user_progress_report_without_org_by_id(self):
         LearnerCourseJsonReport.objects.update(org="")
         CourseOverview.objects.update(org="")
@@ -825,3 +1716,95 @@ class UserProgressReportTests(CourseApiFactoryMixin, APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertEqual(response.data.get("detail"), "Not found.")
+
+
+class QueryCountTests(APITestCase):
+    """
+    Checks that list endpoints run the same number of queries whatever the number of listed rows is.
+    """
+
+    def setUp(self):
+        create_mock_site_config()
+        XMODULE_FACTORY_LOCK.enable()
+
+        self.user = User.objects.create(
+            username='edx',
+            is_staff=True,
+            is_superuser=True,
+            email='edx@example.com'
+        )
+        UserProfile.objects.create(
+            user=self.user,
+            org="FooOrg"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.users_count = 0
+        self.courses = []
+
+    def create_users(self, count):
+        groups = [
+            Group.objects.get_or_create(name=name)[0]
+            for name in (ANALYTICS_ACCESS_GROUP, STUDIO_ADMIN_ACCESS_GROUP, triboo_groups.CATALOG_DENIED_GROUP)
+        ]
+        for index in range(self.users_count, self.users_count + count):
+            user = User.objects.create(
+                username='user{}'.format(index),
+                email='user{}@example.com'.format(index),
+                first_name="first{}".format(index),
+                last_name="last{}".format(index),
+            )
+            UserProfile.objects.create(user=user, name='User {}'.format(index), org="FooOrg")
+            groups[index % len(groups)].user_set.add(user)
+            for course in self.courses:
+                CourseEnrollment.objects.create(user=user, course=course)
+                LearnerCourseJsonReport.objects.create(user=user, course_id=course.id, org="FooOrg")
+        self.users_count += count
+
+    def create_courses(self, count):
+        for __ in range(count):
+            course = CourseFactory.create(org="FooOrg", number="course{}".format(len(self.courses)))
+            self.courses.append(CourseOverview.get_from_id(course.id))
+
+    def count_queries(self, url):
+        # A first request fills the caches, e.g. site organizations and course details.
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries)
+
+    def assertConstantQueries(self, url):
+        self.create_courses(1)
+        self.create_users(2)
+        small_count = self.count_queries(url)
+        self.create_courses(2)
+        self.create_users(8)
+        large_count = self.count_queries(url)
+        self.assertEqual(
+            small_count, large_count,
+            "{} runs {} queries for 3 users and 1 course, {} for 11 users and 3 courses.".format(
+                url, small_count, large_count
+            )
+        )
+
+    def test_users_queries(self):
+        self.assertConstantQueries(reverse('edx_extended_api:users-list'))
+
+    def test_users_cursor_queries(self):
+        self.assertConstantQueries("{}?pagination=cursor&page_size=100".format(reverse('edx_extended_api:users-list')))
+
+    def test_users_export_queries(self):
+        self.assertConstantQueries(reverse('edx_extended_api:users-export'))
+
+    def test_courses_queries(self):
+        self.assertConstantQueries(reverse('edx_extended_api:courses-list'))
+
+    def test_user_progress_report_queries(self):
+        self.assertConstantQueries(reverse('edx_extended_api:user_progress_report-list'))
+
+    def test_user_progress_report_cursor_queries(self):
+        self.assertConstantQueries(
+            "{}?pagination=cursor&page_size=100".format(reverse('edx_extended_api:user_progress_report-list'))
+        )
@@ -1,6 +1,9 @@
 from django.conf.urls import url, include
 from rest_framework.routers import DefaultRouter
-from views import UsersViewSet, UsersByUsernameViewSet, CoursesViewSet, UserProgressViewSet, UserProgressByUsernameViewSet
+from views import (
+    UsersViewSet, UsersByUsernameViewSet, CoursesViewSet, UserProgressViewSet, UserProgressByUsernameViewSet,
+    DeactivationJobsViewSet, ProgressReportJobsViewSet, MetricsView
+)
 
 
 router = DefaultRouter()
@@ -11,7 +14,10 @@ router.register(r'user_progress_report', UserProgressViewSet, base_name='user_pr
 router.register(
     r'user_progress_report_by_username', UserProgressByUsernameViewSet, base_name='user_progress_report_by_username'
 )
+router.register(r'deactivation_jobs', DeactivationJobsViewSet, base_name='deactivation_jobs')
+router.register(r'progress_report_jobs', ProgressReportJobsViewSet, base_name='progress_report_jobs')
 
 urlpatterns = [
+    url(r'api/metrics/$', MetricsView.as_view(), name='metrics'),
     url(r'api/', include(router.urls)),
 ]
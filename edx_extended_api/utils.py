@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import csv
+import datetime
+import json
+import operator
+import os
+import time
+from functools import reduce
+
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.translation import gettext_lazy as _
+from openedx.core.djangoapps.models.course_details import CourseDetails
+from openedx.core.djangoapps.site_configuration import helpers as configuration_helpers
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.encoders import JSONEncoder
+
+from .instrumentation import record
+
+
+COURSE_DETAILS_ATTRIBUTES = (
+    'course_image_asset_path', 'banner_image_asset_path', 'instructor_info', 'course_category', 'vendor',
+    'course_country', 'enrollment_learning_groups'
+)
+COURSE_DETAILS_CACHE_TIMEOUT = getattr(settings, 'EDX_EXTENDED_API_COURSE_DETAILS_CACHE_TIMEOUT', 60 * 60 * 24)
+SITE_ORGS_CACHE_TIMEOUT = getattr(settings, 'EDX_EXTENDED_API_SITE_ORGS_CACHE_TIMEOUT', 60 * 5)
+GROUPS_IDS_CACHE_TIMEOUT = getattr(settings, 'EDX_EXTENDED_API_GROUPS_IDS_CACHE_TIMEOUT', 60 * 5)
+REPORTS_ROOT = getattr(
+    settings, 'EDX_EXTENDED_API_REPORTS_ROOT', os.path.join(settings.MEDIA_ROOT, 'edx_extended_api_reports')
+)
+
+# {site_id: (orgs, expiration_time)}, cleared for a site when its configuration is saved.
+_site_orgs_cache = {}
+
+
+def get_site_orgs(request):
+    """
+    Returns organizations of the current site, resolved once per request.
+
+    Organizations are also kept in a process-level cache by site. The cache entry is dropped
+    when the site configuration is saved and expires after a timeout, so other processes
+    see the change too.
+    """
+    if not hasattr(request, '_site_orgs'):
+        site = getattr(request, 'site', None)
+        cached_orgs, expiration_time = _site_orgs_cache.get(site and site.id, (None, 0))
+        if cached_orgs is None or expiration_time < time.time():
+            cached_orgs = configuration_helpers.get_current_site_orgs() or []
+            if site is not None:
+                _site_orgs_cache[site.id] = (cached_orgs, time.time() + SITE_ORGS_CACHE_TIMEOUT)
+        request._site_orgs = cached_orgs
+    return request._site_orgs
+
+
+def clear_site_orgs_cache(site_id):
+    _site_orgs_cache.pop(site_id, None)
+
+
+def get_course_details(course_overview):
+    """
+    Returns `CourseDetails` attributes used by the API.
+
+    Values are cached by course id and modification date of the course overview,
+    so a new version is fetched from the modulestore once the course is republished.
+    """
+    cache_key = 'edx_extended_api.course_details.{}.{}'.format(
+        course_overview.id,
+        course_overview.modified and course_overview.modified.isoformat()
+    )
+    details = cache.get(cache_key)
+    if details is None:
+        details = fetch_course_details(course_overview.id)
+        cache.set(cache_key, details, COURSE_DETAILS_CACHE_TIMEOUT)
+    return details
+
+
+def fetch_course_details(course_key, attributes=COURSE_DETAILS_ATTRIBUTES):
+    """
+    Returns the given `CourseDetails` attributes of the course, read from the modulestore.
+    """
+    start = time.time()
+    course_details = CourseDetails.fetch(course_key)
+    record('course_details', time.time() - start)
+    return {attr: getattr(course_details, attr) for attr in attributes}
+
+
+def get_modified_since(request):
+    """
+    Returns the `modified_since` query parameter as an aware datetime, or `None` when it is missing.
+
+    A date alone means midnight, naive values are taken as UTC.
+    """
+    value = request.query_params.get('modified_since', '').strip()
+    if not value:
+        return None
+    try:
+        modified_since = parse_datetime(value) or parse_date(value)
+    except ValueError:
+        modified_since = None
+    if modified_since is None:
+        raise ValidationError({'modified_since': _('Enter a valid date or date/time, e.g. 2021-08-10T09:19:05Z.')})
+    if not isinstance(modified_since, datetime.datetime):
+        modified_since = datetime.datetime.combine(modified_since, datetime.time())
+    if timezone.is_naive(modified_since):
+        modified_since = timezone.make_aware(modified_since, timezone.utc)
+    return modified_since
+
+
+def bulk_update_rows(model, rows, key='id', batch_size=1000):
+    """
+    Updates rows given as `{key_value: {field_name: value}}`.
+
+    Django 1.11 has no `bulk_update`, so each batch is applied with one UPDATE
+    setting every changed field with a CASE expression over the keys.
+    """
+    keys = list(rows)
+    for start in range(0, len(keys), batch_size):
+        batch = keys[start:start + batch_size]
+        updates = {}
+        for field_name in set().union(*[rows[key_value] for key_value in batch]):
+            field = model._meta.get_field(field_name)
+            updates[field_name] = Case(
+                *[
+                    When(then=Value(rows[key_value][field_name], output_field=field), **{key: key_value})
+                    for key_value in batch if field_name in rows[key_value]
+                ],
+                default=F(field_name),
+                output_field=field
+            )
+        if updates:
+            model.objects.filter(**{key + '__in': batch}).update(**updates)
+
+
+# {group_name: (group_id, expiration_time)}, cleared when a group is saved or deleted in this process.
+_groups_ids_cache = {}
+
+
+def normalize_identity(value):
+    """
+    Returns the username or email as compared by the case insensitive unique indexes of MySQL.
+    """
+    return (value or '').strip().lower()
+
+
+def get_identities_owners(queryset, field, values):
+    """
+    Returns `{normalized value: set(user_ids)}` of the users of the queryset whose `field` (`username`
+    or `email`) matches one of the values case insensitively, with one query.
+    """
+    values = set(normalize_identity(value) for value in values) - {''}
+    owners = {}
+    if not values:
+        return owners
+    condition = reduce(operator.or_, [Q(**{field + '__iexact': value}) for value in values])
+    for user_id, value in queryset.filter(condition).values_list('id', field):
+        owners.setdefault(normalize_identity(value), set()).add(user_id)
+    return owners
+
+
+def get_groups_ids(group_names):
+    """
+    Returns `{group_name: group_id}` for the given names, creating the missing groups.
+
+    Ids are also kept in a process-level cache, which expires after a timeout so groups
+    deleted and recreated by other processes are eventually seen with their new id.
+    """
+    now = time.time()
+    groups_ids = {
+        name: _groups_ids_cache[name][0] for name in group_names
+        if name in _groups_ids_cache and _groups_ids_cache[name][1] >= now
+    }
+    missing = set(group_names) - set(groups_ids)
+    if missing:
+        loaded = dict(Group.objects.filter(name__in=missing).values_list('name', 'id'))
+        for group_name in missing - set(loaded):
+            loaded[group_name] = Group.objects.get_or_create(name=group_name)[0].id
+        groups_ids.update(loaded)
+        # Ids are cached once committed, so a group created by a rolled back transaction is never cached.
+        expiration_time = now + GROUPS_IDS_CACHE_TIMEOUT
+        transaction.on_commit(lambda: _groups_ids_cache.update(
+            (name, (group_id, expiration_time)) for name, group_id in loaded.items()
+        ))
+    return groups_ids
+
+
+def clear_groups_ids_cache():
+    _groups_ids_cache.clear()
+
+
+def get_reports_storage():
+    """
+    Returns the local storage of the generated report files.
+    """
+    return FileSystemStorage(location=REPORTS_ROOT)
+
+
+class Echo(object):
+    """
+    File-like object that returns the written value, used to stream CSV lines.
+    """
+
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    return '' if value is None else unicode(value).encode('utf-8')
+
+
+def iter_csv(rows, field_names):
+    """
+    Yields CSV lines for the given dict rows, starting with a header line.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow([_csv_value(name) for name in field_names])
+    for row in rows:
+        yield writer.writerow([_csv_value(row.get(name)) for name in field_names])
+
+
+def iter_ndjson(rows):
+    """
+    Yields one JSON document per line for the given rows.
+    """
+    for row in rows:
+        yield json.dumps(row, cls=JSONEncoder) + '\n'
@@ -1,30 +1,251 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
+import hashlib
+import json
+import operator
+import os
+import time
+from calendar import timegm
+from collections import Counter, OrderedDict
+from functools import reduce
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Case, Count, IntegerField, Max, Q, When
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.encoding import force_bytes
+from django.utils.http import http_date, quote_etag
 from rest_framework import generics, viewsets, mixins, status
+from rest_framework.decorators import detail_route, list_route
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from openedx.core.lib.api.authentication import OAuth2AuthenticationAllowInactiveUser
 from django.utils.translation import gettext_lazy as _
 from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
-from openedx.core.djangoapps.site_configuration import helpers as configuration_helpers
-
-from .serializers import CourseSerializer, UserSerializer, RetrieveListUserSerializer, UserProgressSerializer
-from .permissions import IsStaffAndOrgMember
+from student.models import UserProfile
+
+from . import instrumentation, metrics
+from .course_metadata import get_courses_filter
+from .hierarchy import rebuild_user_hierarchy
+from .models import DEACTIVATE_STATUSES, DeactivationJob, ProgressReportJob, UserHierarchy, UserModification
+from .serializers import (
+    PLATFORM_ROLES_FLAGS, CourseSerializer, UserSerializer, RetrieveListUserSerializer, UserProgressSerializer,
+    DeactivationJobSerializer, DeactivationJobResultSerializer, ProgressReportJobSerializer,
+    apply_users_group_changes, get_group_changes, get_sparse_fieldset, pop_user_accesses
+)
+from .paginators import IdCursorPagination
+from .permissions import IsMetricsScraperOrStaffAndOrgMember, IsStaffAndOrgMember
+from .renderers import RENDERER_CLASSES, compress_response
+from .search import SEARCH_FIELDS, SEARCH_MIN_LENGTH, index_users, search_users
+from .tasks import deactivate_users, generate_progress_report
+from .utils import (
+    bulk_update_rows, get_identities_owners, get_modified_since, get_reports_storage, get_site_orgs, iter_csv,
+    iter_ndjson, normalize_identity
+)
+
+
+User = get_user_model()
+
+BULK_BATCH_SIZE = getattr(settings, 'EDX_EXTENDED_API_BULK_BATCH_SIZE', 1000)
+EXPORT_CHUNK_SIZE = getattr(settings, 'EDX_EXTENDED_API_EXPORT_CHUNK_SIZE', 1000)
+SEARCH_USER_FIELDS = set(field for field, lookup, __ in SEARCH_FIELDS if not lookup.startswith('profile__'))
+SEARCH_PROFILE_FIELDS = set(field for field, lookup, __ in SEARCH_FIELDS if lookup.startswith('profile__'))
+EXPORT_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
 
 
 class ByUsernameMixin:
     lookup_field = 'username'
 
 
+class InstrumentationMixin(object):
+    """
+    Measures SQL queries, `CourseDetails` fetches and serialization of the requests sent by staff users
+    with `X-Instrumentation: 1` header, or of every request when `EDX_EXTENDED_API_INSTRUMENTATION` is set.
+
+    Measures are returned in `Server-Timing` and `X-Query-Count` headers, and logged.
+    """
+    measures = None
+
+    def initial(self, request, *args, **kwargs):
+        super(InstrumentationMixin, self).initial(request, *args, **kwargs)
+        # Measuring starts once the user is authenticated, so other users can't turn the query log on.
+        if instrumentation.is_requested(request):
+            self.measures = instrumentation.Instrumentation().__enter__()
+
+    def dispatch(self, request, *args, **kwargs):
+        self.measures = None
+        try:
+            response = super(InstrumentationMixin, self).dispatch(request, *args, **kwargs)
+        finally:
+            if self.measures is not None:
+                self.measures.__exit__(None, None, None)
+        if self.measures is not None:
+            self.measures.add_headers(response)
+            self.measures.log(self.request, response, self)
+        return response
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super(InstrumentationMixin, self).get_serializer(*args, **kwargs)
+        if instrumentation.get_current() is not None:
+            serializer.to_representation = instrumentation.timed('serializer', serializer.to_representation)
+            if hasattr(serializer, 'values_to_representation'):
+                serializer.values_to_representation = instrumentation.timed(
+                    'serializer', serializer.values_to_representation
+                )
+        return serializer
+
+
+class MetricsMixin(object):
+    """
+    Records count, duration, returned rows and item statuses of the requests in the metrics registry.
+    """
+
+    def get_metrics_labels(self):
+        return {
+            'viewset': self.__class__.__name__,
+            'action': getattr(self, 'action', None) or self.request.method.lower(),
+        }
+
+    def record_batch_size(self, size):
+        metrics.registry.observe(
+            'edx_extended_api_bulk_batch_size', self.get_metrics_labels(), size, buckets=metrics.SIZE_BUCKETS
+        )
+
+    def dispatch(self, request, *args, **kwargs):
+        start = time.time()
+        response = super(MetricsMixin, self).dispatch(request, *args, **kwargs)
+        labels = self.get_metrics_labels()
+        metrics.registry.observe('edx_extended_api_request_duration_seconds', labels, time.time() - start)
+        metrics.registry.inc(
+            'edx_extended_api_requests_total', dict(labels, method=request.method, status=response.status_code)
+        )
+
+        data = getattr(response, 'data', None)
+        items = data.get('results') if isinstance(data, dict) and 'results' in data else data
+        if isinstance(items, list):
+            metrics.registry.observe(
+                'edx_extended_api_rows_returned', labels, len(items), buckets=metrics.SIZE_BUCKETS
+            )
+        # Counted first, so a bulk response updates each status once rather than once per item.
+        statuses = Counter(
+            item['status'] for item in (items if isinstance(items, list) else [data])
+            if isinstance(item, dict) and item.get('status')
+        )
+        for item_status, count in statuses.items():
+            metrics.registry.inc('edx_extended_api_item_statuses_total', dict(labels, status=item_status), count)
+        return response
+
+
+class RenderingMixin(object):
+    """
+    Renders responses with the fast JSON renderer, and compresses the large ones when the client accepts it.
+    """
+    renderer_classes = RENDERER_CLASSES
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super(RenderingMixin, self).finalize_response(request, response, *args, **kwargs)
+        if isinstance(response, Response):
+            response.add_post_render_callback(lambda rendered: compress_response(request, rendered))
+        return response
+
+
+class ConditionalGetMixin(object):
+    """
+    Answers conditional GET requests (`If-None-Match` / `If-Modified-Since`) with 304 Not Modified.
+
+    Views call `check_validators`, or `check_queryset_validators`, with cheap validators before serializing
+    anything, responses of views which did not are sent without validators.
+    """
+    conditional_actions = ('list', 'retrieve')
+    validators = (None, None)
+
+    def check_validators(self, request, etag, last_modified):
+        """
+        Returns a 304 response when the client copy is still valid, `None` otherwise.
+        """
+        self.validators = (quote_etag(etag), last_modified and timegm(last_modified.utctimetuple()))
+        return get_conditional_response(request, etag=self.validators[0], last_modified=self.validators[1])
+
+    def check_queryset_validators(self, request, queryset, modified_fields):
+        """
+        Checks validators made of the number of rows of the queryset and of their latest `modified_fields` date,
+        computed with one aggregate query. Returns a 304 response when the client copy is still valid.
+        """
+        validators = queryset.aggregate(count=Count('id', distinct=True), **{
+            'modified_{}'.format(index): Max(field) for index, field in enumerate(modified_fields)
+        })
+        modified = [validators['modified_{}'.format(index)] for index in range(len(modified_fields))]
+        etag = hashlib.md5(force_bytes('{}|{}|{}|{}'.format(
+            request.get_host(), request.get_full_path(), validators['count'], '|'.join(unicode(m) for m in modified)
+        ))).hexdigest()
+        return self.check_validators(request, etag, max([m for m in modified if m is not None] or [None]))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if (request.method == 'GET' and getattr(self, 'action', None) in self.conditional_actions and
+                isinstance(response, Response) and response.status_code == status.HTTP_200_OK and
+                self.validators[0] is not None):
+            etag, last_modified = self.validators
+            response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified)
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified, response=response)
+        return super(ConditionalGetMixin, self).finalize_response(request, response, *args, **kwargs)
+
+
+class CursorPaginationMixin(object):
+    """
+    Switches to keyset pagination ordered by id when `pagination=cursor` query parameter is passed.
+    """
+    cursor_pagination_class = IdCursorPagination
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator') and self.request.query_params.get('pagination') == 'cursor':
+            self._paginator = self.cursor_pagination_class()
+        return super(CursorPaginationMixin, self).paginator
+
+
+class SparseFieldsetQuerysetMixin(object):
+    """
+    Narrows the queryset of GET requests to the columns of the fields requested with `fields` / `exclude`.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super(SparseFieldsetQuerysetMixin, self).filter_queryset(queryset)
+        if self.request.method != 'GET':
+            return queryset
+        serializer = self.get_serializer()
+        if not hasattr(serializer, 'get_columns'):
+            return queryset
+        columns = serializer.get_columns()
+        if any(column.startswith('profile__') for column in columns):
+            queryset = queryset.select_related('profile')
+        if any(get_sparse_fieldset(self.request)):
+            queryset = queryset.only(*columns)
+        return queryset
+
+
 class UserFilterMixin:
     queryset_filter = {}
     filter_by_supervisor = False
+    filter_by_modified = False
 
     def get_queryset(self):
         """
         Restricts the returned users, by filtering by `user_id` query parameter.
+
+        When `filter_by_supervisor` is set, users can also be filtered by supervisor.
+
+        When `filter_by_modified` is set, GET requests also accept `modified_since` to return
+        only the users created or changed since that date.
         """
-        course_org_filter = configuration_helpers.get_current_site_orgs() or []
+        course_org_filter = get_site_orgs(self.request)
         queryset = self.serializer_class.Meta.model.objects.filter(
             profile__org__in=course_org_filter
         ).exclude(
@@ -41,44 +262,88 @@ class UserFilterMixin:
         elif usernames:
             self.queryset_filter = {'username__in': usernames}
         elif self.filter_by_supervisor:
-            supervisors = [u.strip() for u in self.request.query_params.get('supervisor', '').split(',') if u.strip()]
-            self.queryset_filter = supervisors and {'profile__lt_supervisor__in': supervisors} or {}
-        return queryset.filter(**self.queryset_filter)
+            self.queryset_filter = self.get_supervisor_filter()
+        queryset = queryset.filter(**self.queryset_filter)
+
+        modified_since = self.filter_by_modified and self.request.method == 'GET' and get_modified_since(self.request)
+        if modified_since:
+            queryset = queryset.filter(
+                Q(modification__modified__gte=modified_since) | Q(date_joined__gte=modified_since)
+            )
+        return queryset
 
+    def check_users_validators(self, request, lookup=False):
+        """
+        Checks the validators of the filtered users, or of the looked up user, changed when a user
+        is added, removed or changed. Returns a 304 response when the client copy is still valid.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        if lookup:
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[self.lookup_url_kwarg or self.lookup_field]})
+        return self.check_queryset_validators(request, queryset, ('modification__modified', 'date_joined'))
 
-class UsersViewSet(UserFilterMixin, viewsets.ModelViewSet):
+    def get_supervisor_filter(self):
+        """
+        Returns the filter of users by direct supervisor with `supervisor` query parameter,
+        or by any supervisor up the chain with `supervisor_tree`, using the hierarchy index.
+        """
+        supervisors = [u.strip() for u in self.request.query_params.get('supervisor', '').split(',') if u.strip()]
+        supervisor_tree = [
+            u.strip() for u in self.request.query_params.get('supervisor_tree', '').split(',') if u.strip()
+        ]
+        if supervisor_tree:
+            return {'pk__in': UserHierarchy.objects.filter(supervisor__in=supervisor_tree).values('user_id')}
+        return supervisors and {'profile__lt_supervisor__in': supervisors} or {}
+
+
+class UsersViewSet(InstrumentationMixin, MetricsMixin, RenderingMixin, ConditionalGetMixin, CursorPaginationMixin,
+                   SparseFieldsetQuerysetMixin, UserFilterMixin, viewsets.ModelViewSet):
     authentication_classes = (OAuth2AuthenticationAllowInactiveUser,)
     permission_classes = (IsStaffAndOrgMember,)
     serializer_class = UserSerializer
+    filter_by_modified = True
 
-    DEACTIVATE_STATUSES = {
-        True: 'user_deactivated',
-        False: 'user_already_inactive',
-        None: 'user_not_found'
-    }
+    DEACTIVATE_STATUSES = DEACTIVATE_STATUSES
 
     def check_status(self, request, default_status):
+        """
+        Checks the looked up user and username / email conflicts with one query.
+
+        Returns the default status dict when there is nothing to report, an error response otherwise.
+        """
         resp = {'status': default_status}
         queryset = self.get_queryset()
         lookup_field = self.lookup_url_kwarg or self.lookup_field
-        lookup_filter = {lookup_field: self.kwargs.get(lookup_field)}
+        lookup_value = self.kwargs.get(lookup_field)
+
+        conditions = OrderedDict()
+        if lookup_value:
+            conditions['user_found'] = Q(**{lookup_field: lookup_value})
+            conditions['user_inactive'] = Q(is_active=False, **{lookup_field: lookup_value})
+        conditions['username_already_used'] = Q(username=request.data.get('username'))
+        conditions['email_already_used'] = Q(email=request.data.get('email'))
+        facts = queryset.filter(reduce(operator.or_, conditions.values())).aggregate(**{
+            name: Count(Case(When(condition, then=1), output_field=IntegerField()))
+            for name, condition in conditions.items()
+        })
 
         _status = status.HTTP_409_CONFLICT
-        if lookup_filter[lookup_field] and not queryset.filter(**lookup_filter).exists():
+        conflicts = [name for name in ('username_already_used', 'email_already_used') if facts[name]]
+        if lookup_value and not facts['user_found']:
             _status = status.HTTP_404_NOT_FOUND
             resp = {'status': 'user_not_found'}
-        elif lookup_filter[lookup_field] and queryset.filter(is_active=False, **lookup_filter).exists():
+        elif lookup_value and facts['user_inactive']:
             resp = {'status': 'user_inactive'}
-        elif queryset.filter(username=request.data.get('username')).exists():
-            resp = {'status': 'username_already_used'}
-        elif queryset.filter(email=request.data.get('email')).exists():
-            resp = {'status': 'email_already_used'}
+        elif conflicts:
+            resp = {'status': conflicts[0], 'conflicts': conflicts}
         else:
             return resp
 
         return Response(resp, status=_status)
 
     def create(self, request, *args, **kwargs):
+        if isinstance(request.data, list):
+            return self.bulk_create(request, *args, **kwargs)
         serializer = self.get_serializer(data=request.data)
 
         resp = self.check_status(request, 'user_created')
@@ -95,6 +360,81 @@ class UsersViewSet(UserFilterMixin, viewsets.ModelViewSet):
         resp.update(serializer.data)
         return Response(resp, status=status.HTTP_201_CREATED, headers=headers)
 
+    def bulk_create(self, request, *args, **kwargs):
+        """
+        Creates all the posted users at once and returns a status for each of them.
+
+        Items are validated first, then their usernames and emails are checked with two queries, case
+        insensitively like MySQL unique indexes, and users, profiles and group memberships are inserted
+        in bulk within one transaction.
+        """
+        self.action = 'bulk_create'
+        self.record_batch_size(len(request.data))
+        context = dict(self.get_serializer_context(), bulk=True)
+        items_serializers = [self.get_serializer_class()(data=item, context=context) for item in request.data]
+        valid_data = [serializer.validated_data for serializer in items_serializers if serializer.is_valid()]
+        used_usernames = get_identities_owners(User.objects, 'username', [data['username'] for data in valid_data])
+        used_emails = get_identities_owners(self.get_queryset(), 'email', [data['email'] for data in valid_data])
+
+        resp = []
+        new_users = []
+        for item, serializer in zip(request.data, items_serializers):
+            item = item if isinstance(item, dict) else {}
+            item_resp = {'username': item.get('username'), 'email': item.get('email'), 'user_id': None}
+            resp.append(item_resp)
+            if serializer.errors:
+                item_resp.update({'status': 'invalid_data', 'errors': serializer.errors})
+                continue
+            validated_data = serializer.validated_data
+            item_resp.update(username=validated_data['username'], email=validated_data['email'])
+            username = normalize_identity(validated_data['username'])
+            email = normalize_identity(validated_data['email'])
+            if username in used_usernames:
+                item_resp['status'] = 'username_already_used'
+            elif email in used_emails:
+                item_resp['status'] = 'email_already_used'
+            else:
+                item_resp['status'] = 'user_created'
+                used_usernames[username] = set()
+                used_emails[email] = set()
+                new_users.append(validated_data)
+
+        if new_users:
+            users_ids = self.perform_bulk_create(new_users, request.user.profile.org)
+            for item_resp in resp:
+                if item_resp['status'] == 'user_created':
+                    item_resp['user_id'] = users_ids[item_resp['username']]
+        return Response(resp, status=status.HTTP_200_OK)
+
+    def perform_bulk_create(self, users_data, org):
+        """
+        Inserts users with their profiles and groups, returns `{username: user_id}` of the created users.
+        """
+        users, profiles, users_groups = [], {}, {}
+        for validated_data in users_data:
+            profile_data, analytics_access, platform_role, accesses_dict = pop_user_accesses(validated_data, 'Learner')
+            validated_data.update(PLATFORM_ROLES_FLAGS.get(platform_role, {}))
+            users.append(User(**validated_data))
+            profiles[validated_data['username']] = dict(profile_data, org=org)
+            users_groups[validated_data['username']] = get_group_changes(
+                analytics_access, platform_role, accesses_dict
+            )
+
+        with transaction.atomic():
+            User.objects.bulk_create(users, batch_size=BULK_BATCH_SIZE)
+            users_ids = dict(User.objects.filter(username__in=profiles.keys()).values_list('username', 'id'))
+            UserProfile.objects.bulk_create(
+                [UserProfile(user_id=users_ids[username], **data) for username, data in profiles.items()],
+                batch_size=BULK_BATCH_SIZE
+            )
+            apply_users_group_changes({
+                users_ids[username]: group_changes for username, group_changes in users_groups.items()
+            })
+            UserModification.touch(users_ids.values())
+            rebuild_user_hierarchy(users_ids.values())
+            index_users(users_ids.values())
+        return users_ids
+
     def update(self, request, *args, **kwargs):
         self.serializer_class.Meta.extra_kwargs = {"username": {"required": False}}
         partial = kwargs.pop('partial', False)
@@ -116,13 +456,225 @@ class UsersViewSet(UserFilterMixin, viewsets.ModelViewSet):
         resp.update(serializer.data)
         return Response(resp)
 
+    def patch(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if lookup_url_kwarg not in kwargs:
+            return self.bulk_update(request, *args, **kwargs)
+        return self.partial_update(request, *args, **kwargs)
+
+    def bulk_update(self, request, *args, **kwargs):
+        """
+        Partially updates all the listed users at once and returns a status for each of them.
+
+        Each item identifies its user with `user_id` (or `username` for lookups by username).
+        Users are loaded and items validated first, then usernames and emails are checked for conflicts
+        with set-based queries, case insensitively like MySQL unique indexes, and users, profiles
+        and group memberships are updated in batches within one transaction.
+        """
+        self.action = 'bulk_update'
+        if not isinstance(request.data, list):
+            return Response({'detail': _('Expected a list of users.')}, status=status.HTTP_400_BAD_REQUEST)
+        self.record_batch_size(len(request.data))
+
+        by_username = (self.lookup_url_kwarg or self.lookup_field) == 'username'
+        key, lookup = ('username', 'username') if by_username else ('user_id', 'id')
+        items = [item if isinstance(item, dict) else {} for item in request.data]
+        instances = {
+            getattr(user, lookup): user
+            for user in self.get_queryset().filter(**{
+                lookup + '__in': [self.get_bulk_key(item, by_username) for item in items]
+            }).select_related('profile')
+        }
+        context = dict(self.get_serializer_context(), bulk=True)
+        checked_items = []
+        for item in items:
+            instance = instances.get(self.get_bulk_key(item, by_username))
+            data = {field: value for field, value in item.items() if field not in ('user_id', key)}
+            serializer = None
+            if instance is not None and instance.is_active:
+                serializer = self.get_serializer_class()(instance, data=data, partial=True, context=context)
+                serializer.is_valid()
+            checked_items.append((item, data, instance, serializer))
+        valid_data = [
+            serializer.validated_data for __, __, __, serializer in checked_items
+            if serializer is not None and not serializer.errors
+        ]
+        # Usernames are unique among all the users, emails are checked within the site organizations like on creation.
+        owners = {
+            field: get_identities_owners(queryset, field, [data[field] for data in valid_data if field in data])
+            for field, queryset in (('username', User.objects), ('email', self.get_queryset()))
+        }
+
+        resp, users_rows, profiles_rows, users_groups = [], {}, {}, {}
+        # {field: {normalized value: user_id}} of the usernames and emails given to users earlier in the batch.
+        claimed = {'username': {}, 'email': {}}
+        for item, data, instance, serializer in checked_items:
+            item_resp = {
+                'user_id': instance and instance.id,
+                'username': data.get('username', instance and instance.username or item.get('username')),
+            }
+            resp.append(item_resp)
+            if instance is None:
+                item_resp['status'] = 'user_not_found'
+                continue
+            if not instance.is_active:
+                item_resp['status'] = 'user_inactive'
+                continue
+            if serializer.errors:
+                item_resp.update({'status': 'invalid_data', 'errors': serializer.errors})
+                continue
+
+            validated_data = dict(serializer.validated_data)
+            item_resp['username'] = validated_data.get('username', item_resp['username'])
+            identities = [
+                (field, normalize_identity(validated_data[field])) for field in ('username', 'email')
+                if field in validated_data
+            ]
+            conflicts = [
+                '{}_already_used'.format(field) for field, value in identities
+                if owners[field].get(value, set()) - {instance.id} or
+                claimed[field].get(value, instance.id) != instance.id
+            ]
+            if conflicts:
+                item_resp.update({'status': conflicts[0], 'conflicts': conflicts})
+                continue
+
+            profile_data, analytics_access, platform_role, accesses_dict = pop_user_accesses(validated_data)
+            validated_data.update(PLATFORM_ROLES_FLAGS.get(platform_role, {}))
+            users_rows.setdefault(instance.id, {}).update(validated_data)
+            profiles_rows.setdefault(instance.id, {}).update(profile_data)
+            # Items of the same user are merged, the later ones win.
+            groups_to_add, groups_to_remove = get_group_changes(analytics_access, platform_role, accesses_dict)
+            added, removed = users_groups.get(instance.id, (set(), set()))
+            users_groups[instance.id] = (
+                (added - groups_to_remove) | groups_to_add, (removed - groups_to_add) | groups_to_remove
+            )
+            for field, value in identities:
+                claimed[field][value] = instance.id
+            item_resp['status'] = 'user_updated'
+
+        with transaction.atomic():
+            bulk_update_rows(User, users_rows, batch_size=BULK_BATCH_SIZE)
+            bulk_update_rows(UserProfile, profiles_rows, key='user_id', batch_size=BULK_BATCH_SIZE)
+            apply_users_group_changes(users_groups)
+            UserModification.touch(users_rows)
+            rebuild_user_hierarchy([user_id for user_id, data in profiles_rows.items() if 'lt_supervisor' in data])
+            index_users(
+                [user_id for user_id, data in users_rows.items() if set(data) & SEARCH_USER_FIELDS] +
+                [user_id for user_id, data in profiles_rows.items() if set(data) & SEARCH_PROFILE_FIELDS]
+            )
+        return Response(resp, status=status.HTTP_200_OK)
+
+    @staticmethod
+    def get_bulk_key(item, by_username):
+        """
+        Returns the user lookup value of a bulk item.
+        """
+        if by_username:
+            return item.get('username')
+        user_id = unicode(item.get('user_id', '')).strip()
+        return int(user_id) if user_id.isdigit() else None
+
+    def get_values_queryset(self, serializer):
+        """
+        Returns the filtered users as `values()` rows holding only the columns read by the serializer.
+        """
+        return self.filter_queryset(self.get_queryset()).values(*serializer.get_columns())
+
     def retrieve(self, request, *args, **kwargs):
+        not_modified = self.check_users_validators(request, lookup=True)
+        if not_modified is not None:
+            return not_modified
         self.serializer_class = RetrieveListUserSerializer
-        return super(UsersViewSet, self).retrieve(request, *args, **kwargs)
+        serializer = self.get_serializer()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = generics.get_object_or_404(
+            self.get_values_queryset(serializer), **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        self.check_object_permissions(request, row)
+        return Response(serializer.values_to_representation([row])[0])
 
     def list(self, request, *args, **kwargs):
+        not_modified = self.check_users_validators(request)
+        if not_modified is not None:
+            return not_modified
+        self.serializer_class = RetrieveListUserSerializer
+        serializer = self.get_serializer()
+        queryset = self.get_values_queryset(serializer)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.values_to_representation(page))
+        return Response(serializer.values_to_representation(queryset))
+
+    @list_route(methods=['get'])
+    def export(self, request, *args, **kwargs):
+        """
+        Streams all the filtered users as NDJSON or CSV, depending on `export_format` query parameter.
+        """
         self.serializer_class = RetrieveListUserSerializer
-        return super(UsersViewSet, self).list(request, *args, **kwargs)
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in EXPORT_CONTENT_TYPES:
+            return Response(
+                {'detail': _('Export format must be one of: {}.').format(', '.join(sorted(EXPORT_CONTENT_TYPES)))},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        serializer = self.get_serializer()
+        rows = self.iter_export_rows(serializer, self.get_values_queryset(serializer))
+        if export_format == 'csv':
+            content = iter_csv(rows, list(serializer.fields))
+        else:
+            content = iter_ndjson(rows)
+        response = StreamingHttpResponse(content, content_type=EXPORT_CONTENT_TYPES[export_format])
+        response['Content-Disposition'] = 'attachment; filename="users.{}"'.format(export_format)
+        return response
+
+    def iter_export_rows(self, serializer, queryset):
+        """
+        Yields serialized users, reading them by chunks ordered by id so memory use doesn't depend on the org size.
+        """
+        last_id = 0
+        while True:
+            users = list(queryset.filter(id__gt=last_id).order_by('id')[:EXPORT_CHUNK_SIZE])
+            if not users:
+                return
+            for row in serializer.values_to_representation(users):
+                yield row
+            serializer.context.pop('users_groups', None)
+            last_id = users[-1]['id']
+
+    @list_route(methods=['get'])
+    def search(self, request, *args, **kwargs):
+        """
+        Returns the users whose username, email, name, employee id or department starts with `q`, best matches first.
+
+        Matches are found and ranked from the search index, then only the users of the page are loaded.
+        """
+        query = request.query_params.get('q', '').strip()
+        if len(query) < SEARCH_MIN_LENGTH:
+            return Response(
+                {'detail': _('Search must be at least {} characters long.').format(SEARCH_MIN_LENGTH)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        self.serializer_class = RetrieveListUserSerializer
+        serializer = self.get_serializer()
+        queryset = self.get_values_queryset(serializer)
+        matches = search_users(query, get_site_orgs(request))
+        if self.queryset_filter or get_modified_since(request):
+            matches = matches.filter(user_id__in=queryset.values('id'))
+
+        # Results are ordered by rank, which cursor pagination can't follow.
+        if request.query_params.get('pagination') == 'cursor':
+            self._paginator = self.pagination_class and self.pagination_class()
+        page = self.paginate_queryset(matches)
+        matches = page if page is not None else list(matches)
+        users = {row['id']: row for row in queryset.filter(id__in=[match['user_id'] for match in matches])}
+        data = serializer.values_to_representation(
+            [users[match['user_id']] for match in matches if match['user_id'] in users]
+        )
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
 
     def perform_destroy(self, instance):
         instance.is_active = False
@@ -146,14 +698,18 @@ class UsersViewSet(UserFilterMixin, viewsets.ModelViewSet):
         return Response(resp, status=status.HTTP_200_OK)
 
     def bulk_destroy(self, request, *args, **kwargs):
+        self.action = 'bulk_destroy'
         queryset = self.get_queryset()
         if self.queryset_filter:
             preview_statuses = dict(queryset.values_list('id', 'is_active'))
             users = self.queryset_filter.get('pk__in', self.queryset_filter.get('username__in', []))
+            self.record_batch_size(len(users))
             mapping_fields = ('id', 'username') if 'pk__in' in self.queryset_filter else ('username', 'id')
             mapping = dict(queryset.values_list(*mapping_fields))
 
-            queryset.update(is_active=False)
+            with transaction.atomic():
+                queryset.update(is_active=False)
+                UserModification.touch(user_id for user_id, is_active in preview_statuses.items() if is_active)
 
             resp = []
             for u in users:
@@ -172,33 +728,158 @@ class UsersByUsernameViewSet(ByUsernameMixin, UsersViewSet):
     pass
 
 
-class CoursesViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+class CoursesViewSet(InstrumentationMixin, MetricsMixin, RenderingMixin, ConditionalGetMixin, mixins.ListModelMixin,
+                     viewsets.GenericViewSet):
     authentication_classes = (OAuth2AuthenticationAllowInactiveUser,)
     permission_classes = (IsStaffAndOrgMember,)
     serializer_class = CourseSerializer
 
     def get_queryset(self):
-        course_org_filter = configuration_helpers.get_current_site_orgs() or []
-        return self.serializer_class.Meta.model.objects.filter(org__in=course_org_filter).exclude(org=None).exclude(org='')
+        course_org_filter = get_site_orgs(self.request)
+        queryset = self.serializer_class.Meta.model.objects.filter(
+            org__in=course_org_filter
+        ).exclude(org=None).exclude(org='')
+        modified_since = get_modified_since(self.request)
+        if modified_since:
+            queryset = queryset.filter(modified__gte=modified_since)
+        for courses_filter in get_courses_filter(self.request.query_params):
+            queryset = queryset.filter(**courses_filter)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        not_modified = self.check_queryset_validators(request, self.filter_queryset(self.get_queryset()), ('modified',))
+        if not_modified is not None:
+            return not_modified
+        return super(CoursesViewSet, self).list(request, *args, **kwargs)
 
 
-class UserProgressViewSet(UserFilterMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
+class UserProgressViewSet(InstrumentationMixin, MetricsMixin, RenderingMixin, ConditionalGetMixin,
+                          CursorPaginationMixin, SparseFieldsetQuerysetMixin, UserFilterMixin,
+                          mixins.RetrieveModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
     authentication_classes = (OAuth2AuthenticationAllowInactiveUser,)
     permission_classes = (IsStaffAndOrgMember,)
     serializer_class = UserProgressSerializer
     filter_by_supervisor = True
 
-    def get_queryset(self):
-        course_org_filter = configuration_helpers.get_current_site_orgs() or []
-        queryset = self.serializer_class.Meta.model.objects.filter(
-            profile__org__in=course_org_filter
-        ).exclude(
-            profile__org=None
-        ).exclude(
-            profile__org=''
-        )
-        return queryset
+    def retrieve(self, request, *args, **kwargs):
+        not_modified = self.check_users_validators(request, lookup=True)
+        if not_modified is not None:
+            return not_modified
+        return super(UserProgressViewSet, self).retrieve(request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        not_modified = self.check_users_validators(request)
+        if not_modified is not None:
+            return not_modified
+        return super(UserProgressViewSet, self).list(request, *args, **kwargs)
 
 
 class UserProgressByUsernameViewSet(ByUsernameMixin, UserProgressViewSet):
     pass
+
+
+class DeactivationJobsViewSet(InstrumentationMixin, MetricsMixin, RenderingMixin, mixins.CreateModelMixin,
+                              mixins.RetrieveModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    Deactivates users in background, for lists too large to be deactivated within a request.
+    """
+    authentication_classes = (OAuth2AuthenticationAllowInactiveUser,)
+    permission_classes = (IsStaffAndOrgMember,)
+    serializer_class = DeactivationJobSerializer
+
+    def get_queryset(self):
+        course_org_filter = get_site_orgs(self.request)
+        return DeactivationJob.objects.filter(org__in=course_org_filter).order_by('-id')
+
+    def create(self, request, *args, **kwargs):
+        data = request.data if isinstance(request.data, dict) else {}
+        user_ids = data.get('user_id')
+        usernames = data.get('username')
+        if isinstance(user_ids, list) and all(unicode(_id).strip().isdigit() for _id in user_ids):
+            lookup_field, users = 'id', [int(_id) for _id in user_ids]
+        elif isinstance(usernames, list) and all(isinstance(u, basestring) for u in usernames):
+            lookup_field, users = 'username', [u.strip() for u in usernames]
+        else:
+            return Response(
+                {'detail': _('Pass the users to deactivate as a list of `user_id` or `username`.')},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        job = DeactivationJob.objects.create(
+            requested_by=request.user,
+            org=request.user.profile.org,
+            orgs=json.dumps(get_site_orgs(request)),
+            lookup_field=lookup_field,
+            users=json.dumps(users),
+            total=len(users)
+        )
+        # Requests are atomic, the worker must not look the job up before it is committed.
+        transaction.on_commit(lambda: deactivate_users.delay(job.id))
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    @detail_route(methods=['get'])
+    def result(self, request, *args, **kwargs):
+        """
+        Returns deactivation statuses of the users processed so far.
+        """
+        job = self.get_object()
+        page = self.paginate_queryset(job.results.order_by('id'))
+        return self.get_paginated_response(DeactivationJobResultSerializer(page, many=True).data)
+
+
+class ProgressReportJobsViewSet(InstrumentationMixin, MetricsMixin, RenderingMixin, mixins.CreateModelMixin,
+                                mixins.RetrieveModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    Generates in background progress reports of all the users of the site organizations, as downloadable files.
+    """
+    authentication_classes = (OAuth2AuthenticationAllowInactiveUser,)
+    permission_classes = (IsStaffAndOrgMember,)
+    serializer_class = ProgressReportJobSerializer
+
+    def get_queryset(self):
+        course_org_filter = get_site_orgs(self.request)
+        return ProgressReportJob.objects.filter(org__in=course_org_filter).order_by('-id')
+
+    def create(self, request, *args, **kwargs):
+        data = request.data if isinstance(request.data, dict) else {}
+        export_format = data.get('export_format', ProgressReportJob.NDJSON)
+        if export_format not in EXPORT_CONTENT_TYPES:
+            return Response(
+                {'detail': _('Export format must be one of: {}.').format(', '.join(sorted(EXPORT_CONTENT_TYPES)))},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        job = ProgressReportJob.objects.create(
+            requested_by=request.user,
+            org=request.user.profile.org,
+            orgs=json.dumps(get_site_orgs(request)),
+            export_format=export_format
+        )
+        transaction.on_commit(lambda: generate_progress_report.delay(job.id))
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    @detail_route(methods=['get'])
+    def download(self, request, *args, **kwargs):
+        """
+        Streams the report file of a succeeded job.
+        """
+        job = self.get_object()
+        if job.status != ProgressReportJob.SUCCEEDED:
+            return Response({'detail': _('The report is not ready yet.')}, status=status.HTTP_409_CONFLICT)
+        storage = get_reports_storage()
+        if not job.file_name or not storage.exists(job.file_name):
+            raise Http404
+        response = FileResponse(storage.open(job.file_name), content_type=EXPORT_CONTENT_TYPES[job.export_format])
+        response['Content-Disposition'] = 'attachment; filename="{}"'.format(os.path.basename(job.file_name))
+        return response
+
+
+class MetricsView(APIView):
+    """
+    Returns the API metrics of all the processes in Prometheus text format.
+    """
+    authentication_classes = (OAuth2AuthenticationAllowInactiveUser,)
+    permission_classes = (IsMetricsScraperOrStaffAndOrgMember,)
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(metrics.registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
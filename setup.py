@@ -49,6 +49,7 @@ setup(
             "edx_extended_api = edx_extended_api.apps:EdxExtendedApiConfig",
         ],
         "cms.djangoapp": [
+            "edx_extended_api = edx_extended_api.apps:EdxExtendedApiConfig",
         ],
     }
 )